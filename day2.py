@@ -127,14 +127,15 @@ Find the input noun and verb that cause the program to produce the output 196907
 # For part 2, I've simply looped over all possible nouns + verbs to find the answer. 
 # There's also a pattern noticeable; verb+1 increase the output by 1, whereas noun+1 increase the output by a set number (29000ish) so this could be calculated that way as well,
 # but this way was faster.
-
-for noun in range(0,100):
-    for verb in range(0,100):
-        # re-read input every time to reset list
-        input_list = [int(x) for x in inp.split(",")]
-        input_list[1] = noun
-        input_list[2] = verb
-        calc = calculate_opcodes(input_list)
-        if calc == 19690720:
-            print(noun, verb)
-            exit()
+# The loop now lives in intcode.find_noun_verb, which copies one parsed template per run instead of re-reading the input,
+# and spreads the grid over all cores. The __main__ check keeps the pool's worker processes from re-running this part.
+# intcode.solve_noun_verb uses that pattern after all: one symbolic run gives the formula, and it only falls back to the loop
+# when the program turns out not to be linear in the noun and verb.
+
+from intcode import solve_noun_verb
+
+if __name__ == "__main__":
+    # re-read input once, part 1 changed input_list in place
+    template = [int(x) for x in inp.split(",")]
+    noun, verb = solve_noun_verb(template, 19690720)
+    print(noun, verb)
@@ -126,7 +126,11 @@ def shortest_manhattan_distance(intersections):
 
 assert shortest_manhattan_distance(calculate_intersections(SAMPLE_1, SAMPLE_2)) == 159
 
-print(shortest_manhattan_distance(calculate_intersections(line_1, line_2)))
+# The cell sets above grow with the length of the wires. wires.py works on their segments instead,
+# and gives the answers for both parts in one go.
+from wires import closest_crossing
+closest_distance, fewest_steps = closest_crossing(line_1, line_2)
+print(closest_distance)
 
 """
 --- Part Two ---
@@ -245,4 +249,5 @@ def calculate_intersections_counting_steps(line1, line2):
     return min(intersections.values())
 
 assert calculate_intersections_counting_steps(SAMPLE_1, SAMPLE_2) == 610
-print(calculate_intersections_counting_steps(line_1, line_2))
\ No newline at end of file
+# already worked out together with part 1
+print(fewest_steps)
\ No newline at end of file
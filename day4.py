@@ -21,6 +21,8 @@ How many different passwords within the range given in your puzzle input meet th
 
 import re
 
+from passwords import non_decreasing
+
 with open("input/day4.txt") as input_file:
     [low, high] = [int(x) for x in input_file.readline().split("-")]
 
@@ -38,13 +40,14 @@ pattern = r"(\d)\1"
 # print(sorted(str(124789)) == ([x for x in str(124789)]))
 
 
+# Only a few thousand numbers in the range have digits that never decrease, so instead of checking every number
+# we only look at those (non_decreasing in passwords.py generates them directly), and the sorting check goes away.
 def part_1():
     total = 0
-    for i in range(low, high+1):
+    for i in non_decreasing(low, high):
         match = re.search(pattern, str(i))
         if match:
-            if ([x for x in str(i)] == sorted(str(i))):
-                total += 1
+            total += 1
     return total
 
 print(part_1())
@@ -71,13 +74,12 @@ pattern_2 = r"(\d)(\1){2,}"
 
 def part_2():
     total = 0
-    for i in range(low, high+1):
+    for i in non_decreasing(low, high):
         match = re.search(pattern, str(i))
         if match:
             # Check if one digit is in the string exactly twice
             if 2 in [str(i).count(digit) for digit in str(i)]:
-                if ([x for x in str(i)] == sorted(str(i))):
-                    total += 1
+                total += 1
 
     return total
 
@@ -52,115 +52,104 @@ After providing 1 to the only input instruction and passing all the tests, what
 """
 
 # part 1: let's expand the input logic from day 2 a bit
+from intcode import decode_instruction
+
 with open("input/day5.txt") as input_file:
     inp = [int(x) for x in input_file.readline().split(",")]
 
 
-
-# helper function for parameter mode
-def parameter_mode(code_list, mode, num):
-    # Positional mode: the number is a position
-    if mode == "0":
-        return code_list[num]
-    # Immediate mode: the number is the value
-    elif mode == "1":
-        return num
-
-
-
 def calculate_opcodes_new(code_list, ID = 1):
     idx = 0
-    
-    while code_list[idx] != 99:
-        # split value into params and instruction
-        value = str(code_list[idx])
-        if len(value) < 5:
-            value = "0" * (5-len(value)) + value
-        [param3, param2, param1] = value[0:3]
-        instruction = value[4:]
-        # print(value, param1, param2, param3, instruction)
-
-
-        # Addition logic    
-        if instruction == "1":
-            value1 = parameter_mode(code_list, param1, code_list[idx+1])
-            value2 = parameter_mode(code_list, param2, code_list[idx+2])
-            value3 = parameter_mode(code_list, param3, code_list[idx+3])
-            if param3 == "0":
-                code_list[code_list[idx+3]] = value1 + value2
-            # takes 3 parameters, so we move the reader 4 spaces after 
+    # cache of decoded instructions per address; every write drops the entry at the address it wrote to,
+    # so self-modifying programs still get their new instruction decoded
+    decoded = {}
+
+    while True:
+        entry = decoded.get(idx)
+        if entry is None:
+            entry = decoded[idx] = decode_instruction(code_list[idx])
+        instruction, (param1, param2, param3), length = entry
+        # print(code_list[idx], param1, param2, param3, instruction)
+
+        # Addition logic
+        if instruction == 1:
+            value1 = code_list[idx+1] if param1 else code_list[code_list[idx+1]]
+            value2 = code_list[idx+2] if param2 else code_list[code_list[idx+2]]
+            if param3 == 0:
+                target = code_list[idx+3]
+                code_list[target] = value1 + value2
+                decoded.pop(target, None)
+            # takes 3 parameters, so we move the reader 4 spaces after
             idx += 4
 
         # Multiplication logic
-        elif instruction == "2":
-            value1 = parameter_mode(code_list, param1, code_list[idx+1])
-            value2 = parameter_mode(code_list, param2, code_list[idx+2])
-            value3 = parameter_mode(code_list, param3, code_list[idx+3])
-            if param3 == "0":
-                code_list[code_list[idx+3]] = value1 * value2
-            # takes 3 parameters, so we move the reader 4 spaces after 
+        elif instruction == 2:
+            value1 = code_list[idx+1] if param1 else code_list[code_list[idx+1]]
+            value2 = code_list[idx+2] if param2 else code_list[code_list[idx+2]]
+            if param3 == 0:
+                target = code_list[idx+3]
+                code_list[target] = value1 * value2
+                decoded.pop(target, None)
+            # takes 3 parameters, so we move the reader 4 spaces after
             idx += 4
 
-        # Opcode 3 takes a single integer as input and saves it to the position given by its only parameter. 
+        # Opcode 3 takes a single integer as input and saves it to the position given by its only parameter.
         # For example, the instruction 3,50 would take an input value and store it at address 50.
-        elif instruction == "3":
-            code_list[code_list[idx+1]] = ID
+        elif instruction == 3:
+            target = code_list[idx+1]
+            code_list[target] = ID
+            decoded.pop(target, None)
             # takes 1 parameter, so we move the reader 2 spaces after
             idx += 2
 
         # Opcode 4 outputs the value of its only parameter. For example, the instruction 4,50 would output the value at address 50.
-        elif instruction == "4":
-            value1 = parameter_mode(code_list, param1, code_list[idx+1])
-            ID = value1
+        elif instruction == 4:
+            ID = code_list[idx+1] if param1 else code_list[code_list[idx+1]]
             # takes 1 parameter, so we move the reader 2 spaces after
-            idx += 2           
+            idx += 2
 
 
         # part 2 is implemented with 4 more functions for 5-8
         # Opcode 5 is jump-if-true: if the first parameter is non-zero, it sets the instruction pointer to the value from the second parameter. Otherwise, it does nothing.
-        elif instruction == "5":
-            value1 = parameter_mode(code_list, param1, code_list[idx+1])
-            value2 = parameter_mode(code_list, param2, code_list[idx+2])
+        elif instruction == 5:
+            value1 = code_list[idx+1] if param1 else code_list[code_list[idx+1]]
             if value1 != 0:
-                idx = value2
+                idx = code_list[idx+2] if param2 else code_list[code_list[idx+2]]
             else:
                 idx += 3
-        
+
         # Opcode 6 is jump-if-false: if the first parameter is zero, it sets the instruction pointer to the value from the second parameter. Otherwise, it does nothing.
-        elif instruction == "6":
-            value1 = parameter_mode(code_list, param1, code_list[idx+1])
-            value2 = parameter_mode(code_list, param2, code_list[idx+2])
+        elif instruction == 6:
+            value1 = code_list[idx+1] if param1 else code_list[code_list[idx+1]]
             if value1 == 0:
-                idx = value2
+                idx = code_list[idx+2] if param2 else code_list[code_list[idx+2]]
             else:
                 idx += 3
-                
+
 
         # Opcode 7 is less than: if the first parameter is less than the second parameter, it stores 1 in the position given by the third parameter. Otherwise, it stores 0.
-        elif instruction == "7":
-            value1 = parameter_mode(code_list, param1, code_list[idx+1])
-            value2 = parameter_mode(code_list, param2, code_list[idx+2])
-            if value1 < value2:
-                code_list[code_list[idx+3]] = 1
-            else:
-                code_list[code_list[idx+3]] = 0
+        elif instruction == 7:
+            value1 = code_list[idx+1] if param1 else code_list[code_list[idx+1]]
+            value2 = code_list[idx+2] if param2 else code_list[code_list[idx+2]]
+            target = code_list[idx+3]
+            code_list[target] = 1 if value1 < value2 else 0
+            decoded.pop(target, None)
             idx += 4
 
         # Opcode 8 is equals: if the first parameter is equal to the second parameter, it stores 1 in the position given by the third parameter. Otherwise, it stores 0.
-        elif instruction == "8":
-            value1 = parameter_mode(code_list, param1, code_list[idx+1])
-            value2 = parameter_mode(code_list, param2, code_list[idx+2])
-            if value1 == value2:
-                code_list[code_list[idx+3]] = 1
-            else:
-                code_list[code_list[idx+3]] = 0
+        elif instruction == 8:
+            value1 = code_list[idx+1] if param1 else code_list[code_list[idx+1]]
+            value2 = code_list[idx+2] if param2 else code_list[code_list[idx+2]]
+            target = code_list[idx+3]
+            code_list[target] = 1 if value1 == value2 else 0
+            decoded.pop(target, None)
             idx += 4
 
+        # 99 halts the program, anything else is unknown so we stop as well
         else:
             break
     # print(code_list)
     return ID
-    
 
 # print(calculate_opcodes_new([1002,4,3,4,33]))
 # print(calculate_opcodes_new([1101,100,-1,4,0]))
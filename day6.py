@@ -105,7 +105,12 @@ with open("input/day6.txt") as input_file:
     inp = input_file.readlines()
 
 galaxy = parse_input(inp)
-print(total_count(galaxy))
+
+# count_total_orbits walks every object's whole chain again (and recurses, so a long enough chain crashes).
+# orbits.py works out every depth once, from the depth of the object it orbits, and the checksum is their sum.
+from orbits import OrbitMap
+assert OrbitMap.from_galaxy(sample_galaxy).checksum() == 42
+print(OrbitMap.from_galaxy(galaxy).checksum())
 
 """
 --- Part Two ---
@@ -171,7 +176,10 @@ sample_galaxy["SAN"] = ["I"]
 
 
 # Calculate route to the beginning storing all points
-def travel_back(a, galaxy, route=[]):
+# (a list as default argument would be shared between calls, so every call without a route of its own gets a new one)
+def travel_back(a, galaxy, route=None):
+    if route is None:
+        route = []
     if a in galaxy:
         route.append(a)
         return travel_back(galaxy[a][0], galaxy, route)
@@ -187,6 +195,8 @@ your_route = (travel_back("YOU", sample_galaxy, []))
 santa_route = (travel_back("SAN", sample_galaxy, []))
 print(find_closest_intersection(your_route, santa_route))
 
-your_route2 = (travel_back("YOU", galaxy, []))
-santa_route2 = (travel_back("SAN", galaxy, []))
-print(find_closest_intersection(your_route2, santa_route2))
+# Building both routes and searching one in the other is quadratic, which is fine once but not for lots of questions.
+# TransferIndex in orbits.py answers any pair through their lowest common ancestor in O(log n) instead.
+from orbits import TransferIndex
+assert TransferIndex(OrbitMap.from_galaxy(sample_galaxy)).transfers("YOU", "SAN") == find_closest_intersection(your_route, santa_route)
+print(TransferIndex(OrbitMap.from_galaxy(galaxy)).transfers("YOU", "SAN"))
@@ -0,0 +1,941 @@
+"""
+Shared Intcode computer.
+
+Day 2 and day 5 both run Intcode programs, and later days keep building on it, so the interpreter lives here instead of being
+copied into every day. This module doesn't read any puzzle input, so it can be imported freely.
+"""
+import json
+import mmap
+import multiprocessing
+import os
+import time
+from array import array
+from collections import Counter, deque
+from dataclasses import dataclass, field
+
+try:
+    import numpy
+except ImportError:
+    # only load_program uses it, and it works without (just slower)
+    numpy = None
+
+# how many spaces the reader moves after each instruction (the instruction itself + its parameters)
+INSTRUCTION_LENGTHS = {1: 4, 2: 4, 3: 2, 4: 2, 5: 3, 6: 3, 7: 4, 8: 4, 99: 1}
+
+
+# helper function to split an instruction into its opcode and parameter modes.
+# Doing this with numbers instead of padding strings is a lot cheaper, and the result only depends on the value at that address,
+# so it can be cached until something writes to that address.
+def decode_instruction(value):
+    instruction = value % 100
+    modes = (value // 100 % 10, value // 1000 % 10, value // 10000 % 10)
+    return instruction, modes, INSTRUCTION_LENGTHS.get(instruction, 1)
+
+
+# superinstructions, see decode_fused
+OPERATE_JUMP = 100
+ARITHMETIC_PAIR = 101
+
+
+# Like decode_instruction, but looks one instruction ahead for a pair that can run as a single superinstruction:
+# an add/multiply/compare followed by a jump (5/6) on the value it just wrote (a loop counter going down, or a compare and branch),
+# or an add/multiply followed by another one that reads its result.
+# The result of the first instruction is still written to memory, so it doesn't matter who else reads it. A fused entry remembers
+# the second instruction's word, and the VM falls back to running them one by one when that code has changed.
+def decode_fused(memory, ip):
+    entry = decode_instruction(memory[ip])
+    instruction, modes, _ = entry
+    if instruction not in (1, 2, 7, 8) or ip + 7 >= len(memory):
+        return entry
+    word = memory[ip+4]
+    second, second_modes, _ = decode_instruction(word)
+    target = memory[ip+3]
+    if second in (5, 6) and second_modes[0] == 0 and memory[ip+5] == target:
+        return OPERATE_JUMP, modes, (instruction, second, second_modes, word)
+    reads_result = (second_modes[0] == 0 and memory[ip+5] == target) or (second_modes[1] == 0 and memory[ip+6] == target)
+    if instruction in (1, 2) and second in (1, 2) and reads_result:
+        return ARITHMETIC_PAIR, modes, (instruction, second, second_modes, word)
+    return entry
+
+
+# Execution profile collected by IntcodeVM.profile(): how often every opcode ran, how often every address was executed,
+# and for every jump (5/6) how often it was taken or not.
+@dataclass
+class Profile:
+    instructions: int = 0
+    opcodes: Counter = field(default_factory=Counter)
+    addresses: Counter = field(default_factory=Counter)
+    # address -> [taken, not taken]
+    branches: dict = field(default_factory=dict)
+
+    def branch_ratios(self):
+        return {address: taken / (taken + skipped) for address, (taken, skipped) in self.branches.items()}
+
+    def to_json(self):
+        return json.dumps({
+            "instructions": self.instructions,
+            "opcodes": {str(opcode): count for opcode, count in sorted(self.opcodes.items())},
+            "addresses": {str(address): count for address, count in sorted(self.addresses.items())},
+            "branches": {str(address): {"taken": taken, "not_taken": skipped, "ratio": taken / (taken + skipped)}
+                         for address, (taken, skipped) in sorted(self.branches.items())},
+        })
+
+    # plain text report with the hottest addresses and branches first
+    def report(self, top=10):
+        lines = [f"instructions retired: {self.instructions}", "", "opcode  count      share"]
+        for opcode, count in self.opcodes.most_common():
+            lines.append(f"{opcode:>6}  {count:<9}  {count / self.instructions:6.1%}")
+        lines += ["", "address  hits"]
+        for address, count in self.addresses.most_common(top):
+            lines.append(f"{address:>7}  {count}")
+        lines += ["", "branch   taken      not taken  ratio"]
+        hottest = sorted(self.branches.items(), key=lambda item: -sum(item[1]))[:top]
+        for address, (taken, skipped) in hottest:
+            lines.append(f"{address:>6}   {taken:<9}  {skipped:<9}  {taken / (taken + skipped):.2f}")
+        return "\n".join(lines)
+
+
+# Compact, auto-growing memory for big programs. Values live in an array('q') (8 bytes each instead of a pointer plus an int object),
+# which turns into a plain list the first time a value doesn't fit in 64 bits. Writing past the end grows the array if the address
+# is close by, and anything further out goes into a dict, so a single write to address 10**12 doesn't allocate terabytes.
+# Unwritten addresses read as 0, negative ones are an error. It's slower than a bare list per access, so it's opt-in (compact=True).
+class Memory:
+    # how far past the end a write may land and still grow the dense part instead of going into the dict
+    GROW_LIMIT = 1 << 16
+
+    def __init__(self, values=()):
+        try:
+            self.dense = array("q", values)
+        except OverflowError:
+            self.dense = list(values)
+        self.sparse = {}
+
+    def __len__(self):
+        return len(self.dense)
+
+    def __iter__(self):
+        return iter(self.dense)
+
+    def __getitem__(self, address):
+        if isinstance(address, slice):
+            return list(self.dense[address])
+        if address < 0:
+            raise IndexError(f"negative address {address}")
+        try:
+            return self.dense[address]
+        except IndexError:
+            return self.sparse.get(address, 0)
+
+    def __setitem__(self, address, value):
+        if address < 0:
+            raise IndexError(f"negative address {address}")
+        try:
+            self.dense[address] = value
+        except IndexError:
+            self._grow(address, value)
+        except OverflowError:
+            self.dense = list(self.dense)
+            self.dense[address] = value
+
+    def _grow(self, address, value):
+        size = len(self.dense)
+        if address >= size + self.GROW_LIMIT:
+            self.sparse[address] = value
+            return
+        # grow with some slack so a program writing upwards one address at a time doesn't grow on every write
+        new_size = max(address + 1, size + size // 4)
+        self.dense.extend([0] * (new_size - size))
+        for moved in [a for a in self.sparse if a < new_size]:
+            self.dense[moved] = self.sparse.pop(moved)
+        self[address] = value
+
+    def copy(self):
+        memory = Memory()
+        memory.dense = self.dense[:]
+        memory.sparse = dict(self.sparse)
+        return memory
+
+
+@dataclass
+class LoadStats:
+    bytes: int = 0
+    values: int = 0
+    seconds: float = 0.0
+
+    @property
+    def mb_per_second(self):
+        return self.bytes / 1e6 / self.seconds if self.seconds else 0.0
+
+
+LOAD_CHUNK_SIZE = 1 << 22
+
+
+# whether some field has nothing but whitespace in it, which NumPy would quietly read as a 0.
+# Dropping the whitespace first (if there is any, usually there's none) leaves simple substring checks, all done in C.
+def _has_empty_field(chunk):
+    compact = chunk
+    if any(space in chunk for space in (b" ", b"\t", b"\n", b"\r", b"\x0b", b"\x0c")):
+        compact = chunk.translate(None, b" \t\n\r\x0b\x0c")
+    return not compact or compact.startswith(b",") or compact.endswith(b",") or b",," in compact
+
+
+# Parse one chunk of comma-separated integers into an array("q"), or a list if some value doesn't fit in 64 bits.
+# NumPy does the parsing in C, but it clips out-of-range values to the int64 limits, stops quietly at a trailing comma and
+# turns empty fields like "1, ,2" or "1,2,\r" into zeros, so any chunk where that could have happened goes through int() instead,
+# which also gives the proper error for malformed input.
+def _parse_chunk(chunk):
+    if numpy is not None and not _has_empty_field(chunk):
+        try:
+            values = numpy.fromstring(chunk.decode("ascii"), dtype=numpy.int64, sep=",")
+        except (UnicodeDecodeError, ValueError):
+            values = None
+        limits = numpy.iinfo(numpy.int64)
+        if values is not None and len(values) == chunk.count(b",") + 1 and not numpy.isin(values, (limits.min, limits.max)).any():
+            return array("q", values.tobytes())
+    values = list(map(int, chunk.split(b",")))
+    try:
+        return array("q", values)
+    except OverflowError:
+        return values
+
+
+# Load a program file (one line of comma-separated integers) straight into compact Memory, without building a list of strings
+# and a list of ints for the whole file first. The file is memory-mapped and parsed a few MB at a time, every chunk cut at a comma
+# (with NumPy if it's installed, see _parse_chunk). Both parsers skip whitespace around values, so negative values and a trailing
+# newline need no special care. Pass a LoadStats to get the size and throughput.
+def load_program(path, stats=None, chunk_size=LOAD_CHUNK_SIZE):
+    start = time.perf_counter()
+    memory = Memory()
+    size = 0
+    with open(path, "rb") as program_file:
+        if os.fstat(program_file.fileno()).st_size:
+            with mmap.mmap(program_file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                # only the first line, like readline() would
+                size = data.find(b"\n")
+                size = len(data) if size == -1 else size
+                position = 0
+                while position < size:
+                    end = size
+                    if position + chunk_size < size:
+                        end = data.find(b",", position + chunk_size, size)
+                        end = size if end == -1 else end
+                    values = _parse_chunk(data[position:end])
+                    if type(values) is list and type(memory.dense) is not list:
+                        # a value that doesn't fit in 64 bits, from here on it's a plain list (just like Memory does it)
+                        memory.dense = list(memory.dense)
+                    memory.dense.extend(values)
+                    position = end + 1
+    if stats is not None:
+        stats.bytes += size
+        stats.values += len(memory)
+        stats.seconds += time.perf_counter() - start
+    return memory
+
+
+# Saved state of an IntcodeVM: memory, instruction pointer and queued input (plus the decode cache, so forks don't redo it).
+# Fork it as often as you like; every fork continues from exactly this point with its own copy of the state, on the same kind
+# of machine the snapshot was taken from. Treat it as read-only; it holds a dict, so it isn't hashable.
+@dataclass
+class Snapshot:
+    memory: tuple
+    ip: int
+    inputs: tuple
+    decoded: dict
+    waiting: bool
+    halted: bool
+    fuse: bool = False
+    # the IntcodeVM class to fork into, None for a plain IntcodeVM
+    machine: type = None
+
+    def fork(self, *inputs):
+        if self.machine is None or self.machine is IntcodeVM:
+            vm = IntcodeVM((), self.inputs + inputs)
+            # the machine starts out sharing our tuple and only copies it into a list once it's used, see IntcodeVM.memory.
+            # Compact memory is snapshotted as a Memory instead, that one is simply copied.
+            vm.memory = self.memory.copy() if isinstance(self.memory, Memory) else self.memory
+        else:
+            # subclasses like CompiledVM set themselves up from the program they're given, so they get the memory right away
+            vm = self.machine(self.memory, self.inputs + inputs, compact=isinstance(self.memory, Memory))
+        vm.ip = self.ip
+        vm.decoded = dict(self.decoded)
+        vm.waiting = self.waiting
+        vm.halted = self.halted
+        vm.fuse = self.fuse
+        return vm
+
+
+# A resumable Intcode machine. run() is a generator that yields every output as soon as it's produced.
+# When the program hits opcode 3 without any input queued, the generator simply stops and the machine keeps its state,
+# so you can feed() it more input and call run() again to continue where it left off.
+# With fuse=True common instruction pairs run as superinstructions (see decode_fused), counted in fusion_stats.
+class IntcodeVM:
+    def __init__(self, program, inputs=(), compact=False, fuse=False):
+        if compact:
+            # a Memory (from load_program, say) is copied in one go instead of value by value
+            self.memory = program.copy() if isinstance(program, Memory) else Memory(program)
+        else:
+            self.memory = list(program)
+        self.ip = 0
+        self.inputs = deque(inputs)
+        # decoded instructions per address, see decode_instruction
+        self.decoded = {}
+        self.waiting = False
+        self.halted = False
+        self.fuse = fuse
+        # how often each kind of superinstruction ran, and how often one had to fall back; a list is cheaper to count in than a dict
+        self.fusion_counts = [0, 0, 0]
+
+    # Memory can start out as a tuple shared with a Snapshot; it's copied into a list of our own the first time it's accessed,
+    # so forks that never run never copy anything. run() fetches it once, so this costs nothing per instruction.
+    @property
+    def memory(self):
+        if type(self._memory) is tuple:
+            self._memory = list(self._memory)
+        return self._memory
+
+    @memory.setter
+    def memory(self, value):
+        self._memory = value
+
+    def feed(self, *values):
+        self.inputs.extend(values)
+
+    @property
+    def fusion_stats(self):
+        operate_jumps, arithmetic_pairs, fallbacks = self.fusion_counts
+        return {"operate+jump": operate_jumps, "add/mul pair": arithmetic_pairs, "fallback": fallbacks}
+
+    def snapshot(self):
+        memory = self.memory.copy() if isinstance(self.memory, Memory) else tuple(self.memory)
+        return Snapshot(memory, self.ip, tuple(self.inputs), dict(self.decoded), self.waiting, self.halted, self.fuse,
+                        type(self))
+
+    def run(self):
+        memory = self.memory
+        decoded = self.decoded
+        inputs = self.inputs
+        fuse = self.fuse
+        fusion_counts = self.fusion_counts
+        ip = self.ip
+        self.waiting = False
+
+        while True:
+            entry = decoded.get(ip)
+            if entry is None:
+                entry = decoded[ip] = decode_fused(memory, ip) if fuse else decode_instruction(memory[ip])
+            instruction, (mode1, mode2, _), _ = entry
+
+            # superinstructions (see decode_fused) go first, they stand in for two of the instructions below
+            # add/multiply/compare, then jump on the value it wrote
+            if instruction == 100:
+                operation, jump, (_, jump_mode2, _), word = entry[2]
+                value1 = memory[ip+1] if mode1 else memory[memory[ip+1]]
+                value2 = memory[ip+2] if mode2 else memory[memory[ip+2]]
+                target = memory[ip+3]
+                if operation == 1:
+                    memory[target] = value1 + value2
+                elif operation == 2:
+                    memory[target] = value1 * value2
+                elif operation == 7:
+                    memory[target] = 1 if value1 < value2 else 0
+                else:
+                    memory[target] = 1 if value1 == value2 else 0
+                decoded.pop(target, None)
+                if memory[ip+4] != word:
+                    # the jump isn't there anymore, so run whatever is there now the normal way
+                    decoded.pop(ip, None)
+                    fusion_counts[2] += 1
+                    ip += 4
+                    continue
+                if (memory[memory[ip+5]] != 0) == (jump == 5):
+                    ip = memory[ip+6] if jump_mode2 else memory[memory[ip+6]]
+                else:
+                    ip += 7
+                fusion_counts[0] += 1
+
+            # superinstruction: add/multiply, then another add/multiply on its result
+            elif instruction == 101:
+                first, second, (second_mode1, second_mode2, _), word = entry[2]
+                value1 = memory[ip+1] if mode1 else memory[memory[ip+1]]
+                value2 = memory[ip+2] if mode2 else memory[memory[ip+2]]
+                target = memory[ip+3]
+                memory[target] = value1 + value2 if first == 1 else value1 * value2
+                decoded.pop(target, None)
+                if memory[ip+4] != word:
+                    decoded.pop(ip, None)
+                    fusion_counts[2] += 1
+                    ip += 4
+                    continue
+                value1 = memory[ip+5] if second_mode1 else memory[memory[ip+5]]
+                value2 = memory[ip+6] if second_mode2 else memory[memory[ip+6]]
+                target = memory[ip+7]
+                memory[target] = value1 + value2 if second == 1 else value1 * value2
+                decoded.pop(target, None)
+                ip += 8
+                fusion_counts[1] += 1
+
+            # add
+            elif instruction == 1:
+                value1 = memory[ip+1] if mode1 else memory[memory[ip+1]]
+                value2 = memory[ip+2] if mode2 else memory[memory[ip+2]]
+                target = memory[ip+3]
+                memory[target] = value1 + value2
+                decoded.pop(target, None)
+                ip += 4
+
+            # multiply
+            elif instruction == 2:
+                value1 = memory[ip+1] if mode1 else memory[memory[ip+1]]
+                value2 = memory[ip+2] if mode2 else memory[memory[ip+2]]
+                target = memory[ip+3]
+                memory[target] = value1 * value2
+                decoded.pop(target, None)
+                ip += 4
+
+            # input: pause here (without moving the reader) if nothing is queued yet
+            elif instruction == 3:
+                if not inputs:
+                    self.ip = ip
+                    self.waiting = True
+                    return
+                target = memory[ip+1]
+                memory[target] = inputs.popleft()
+                decoded.pop(target, None)
+                ip += 2
+
+            # output: hand the value out right away, the caller can inspect or snapshot the machine in between
+            elif instruction == 4:
+                value1 = memory[ip+1] if mode1 else memory[memory[ip+1]]
+                ip += 2
+                self.ip = ip
+                yield value1
+
+            # jump-if-true
+            elif instruction == 5:
+                value1 = memory[ip+1] if mode1 else memory[memory[ip+1]]
+                if value1 != 0:
+                    ip = memory[ip+2] if mode2 else memory[memory[ip+2]]
+                else:
+                    ip += 3
+
+            # jump-if-false
+            elif instruction == 6:
+                value1 = memory[ip+1] if mode1 else memory[memory[ip+1]]
+                if value1 == 0:
+                    ip = memory[ip+2] if mode2 else memory[memory[ip+2]]
+                else:
+                    ip += 3
+
+            # less than
+            elif instruction == 7:
+                value1 = memory[ip+1] if mode1 else memory[memory[ip+1]]
+                value2 = memory[ip+2] if mode2 else memory[memory[ip+2]]
+                target = memory[ip+3]
+                memory[target] = 1 if value1 < value2 else 0
+                decoded.pop(target, None)
+                ip += 4
+
+            # equals
+            elif instruction == 8:
+                value1 = memory[ip+1] if mode1 else memory[memory[ip+1]]
+                value2 = memory[ip+2] if mode2 else memory[memory[ip+2]]
+                target = memory[ip+3]
+                memory[target] = 1 if value1 == value2 else 0
+                decoded.pop(target, None)
+                ip += 4
+
+            # 99 halts the program, anything else is unknown so we stop as well
+            else:
+                self.ip = ip
+                self.halted = True
+                return
+
+    __iter__ = run
+
+    # Push a (possibly endless) stream of inputs through a single machine, yielding outputs as they come.
+    # Input is only pulled from the iterator when the program actually asks for it.
+    def stream(self, inputs):
+        inputs = iter(inputs)
+        while True:
+            yield from self.run()
+            if self.halted:
+                return
+            try:
+                self.feed(next(inputs))
+            except StopIteration:
+                return
+
+    # write helper for the slow paths; the run loops inline this
+    def _write(self, target, value):
+        self.memory[target] = value
+        self.decoded.pop(target, None)
+
+    # Same as run(), but records a Profile along the way (pass one in to keep adding to it across resumes).
+    # This is a separate loop on purpose, so run() itself doesn't pay anything for profiling.
+    def profile(self, profile=None):
+        profile = Profile() if profile is None else profile
+        memory = self.memory
+        inputs = self.inputs
+        opcodes = profile.opcodes
+        addresses = profile.addresses
+        branches = profile.branches
+        write = self._write
+        ip = self.ip
+        self.waiting = False
+
+        while True:
+            instruction, (mode1, mode2, _), _ = decode_instruction(memory[ip])
+            if instruction == 3 and not inputs:
+                self.ip = ip
+                self.waiting = True
+                return
+            if instruction in INSTRUCTION_LENGTHS and instruction != 99:
+                profile.instructions += 1
+                opcodes[instruction] += 1
+                addresses[ip] += 1
+
+            if instruction in (1, 2, 7, 8):
+                value1 = memory[ip+1] if mode1 else memory[memory[ip+1]]
+                value2 = memory[ip+2] if mode2 else memory[memory[ip+2]]
+                if instruction == 1:
+                    result = value1 + value2
+                elif instruction == 2:
+                    result = value1 * value2
+                elif instruction == 7:
+                    result = 1 if value1 < value2 else 0
+                else:
+                    result = 1 if value1 == value2 else 0
+                write(memory[ip+3], result)
+                ip += 4
+            elif instruction == 3:
+                write(memory[ip+1], inputs.popleft())
+                ip += 2
+            elif instruction == 4:
+                value1 = memory[ip+1] if mode1 else memory[memory[ip+1]]
+                ip += 2
+                self.ip = ip
+                yield value1
+            elif instruction in (5, 6):
+                value1 = memory[ip+1] if mode1 else memory[memory[ip+1]]
+                counts = branches.setdefault(ip, [0, 0])
+                if (value1 != 0) == (instruction == 5):
+                    counts[0] += 1
+                    ip = memory[ip+2] if mode2 else memory[memory[ip+2]]
+                else:
+                    counts[1] += 1
+                    ip += 3
+            else:
+                self.ip = ip
+                self.halted = True
+                return
+
+
+
+# A basic block compiled into a Python function. run(memory) executes the whole block and returns the next instruction pointer.
+# `writes` are the addresses the block writes to (they're fixed once the block is compiled), `code` the addresses it was built from,
+# and `stop` means the block ends on an instruction the driver has to run itself (input, output or halt).
+class Block:
+    def __init__(self, run, writes, code, stop):
+        self.run = run
+        self.writes = writes
+        self.code = code
+        self.stop = stop
+
+
+# Turn the straight-line code starting at `start` into a single Python function, with all parameter modes resolved up front:
+# a position-mode parameter becomes m[address], an immediate one a literal. The block ends after a jump (5/6) or before any I/O or halt.
+# If an instruction writes into the code that follows it in the same block, the block is cut off right after that instruction,
+# so the rest gets compiled from the new code.
+def compile_block(memory, start):
+    size = len(memory)
+    # negative addresses index from the end of a list like in the interpreter, but spelled out so the write bookkeeping matches.
+    # Memory doesn't allow them at all, so those are left alone to fail when they run.
+    wrap = size if type(memory) is list else 0
+
+    def position(address):
+        return memory[address] + wrap if -wrap <= memory[address] < 0 else memory[address]
+
+    def operand(address, mode):
+        return str(memory[address]) if mode else f"m[{position(address)}]"
+
+    # first find the straight-line run of instructions. Running into the end of memory just ends the block;
+    # earlier writes may well change that code before it's reached, and if not, the driver will hit the error itself.
+    straight = []
+    ip = start
+    while True:
+        if straight and ip >= size:
+            break
+        instruction, modes, length = decode_instruction(memory[ip])
+        if instruction not in (1, 2, 5, 6, 7, 8) or straight and ip + length > size:
+            break
+        straight.append((ip, instruction, modes))
+        ip += length
+        if instruction in (5, 6):
+            break
+    # a block that stops on I/O or halt also depends on that instruction staying what it is
+    end = ip if straight and straight[-1][1] in (5, 6) else ip + 1
+
+    lines = []
+    writes = []
+    stop = True
+    for address, instruction, (mode1, mode2, _) in straight:
+        value1, value2 = operand(address+1, mode1), operand(address+2, mode2)
+        if instruction in (5, 6):
+            condition = value1 if instruction == 5 else f"not {value1}"
+            lines.append(f"return {value2} if {condition} else {address+3}")
+            stop = False
+            break
+        target = position(address+3)
+        if instruction == 1:
+            lines.append(f"m[{target}] = {value1} + {value2}")
+        elif instruction == 2:
+            lines.append(f"m[{target}] = {value1} * {value2}")
+        elif instruction == 7:
+            lines.append(f"m[{target}] = 1 if {value1} < {value2} else 0")
+        else:
+            lines.append(f"m[{target}] = 1 if {value1} == {value2} else 0")
+        writes.append(target)
+        if address + 4 <= target < end:
+            ip = end = address + 4
+            lines.append(f"return {ip}")
+            stop = False
+            break
+    else:
+        lines.append(f"return {ip}")
+
+    source = "def block(m):\n" + "".join(f"    {line}\n" for line in lines)
+    namespace = {}
+    exec(source, namespace)
+    return Block(namespace["block"], tuple(set(writes)), range(start, end), stop)
+
+
+# compiled blocks per program image, shared by every CompiledVM that starts from the same program.
+# Only the most recently used images are kept, so running lots of different programs doesn't grow it forever.
+_block_cache = {}
+BLOCK_CACHE_SIZE = 32
+
+
+# IntcodeVM that runs compiled basic blocks instead of single instructions; same interface, just faster on loop-heavy programs.
+# Only I/O and halting go through the regular decode step. When anything writes into the code of a compiled block,
+# that block is dropped and gets recompiled from the new code the next time it runs.
+class CompiledVM(IntcodeVM):
+    def __init__(self, program, inputs=(), compact=False):
+        super().__init__(program, inputs, compact)
+        self.image = tuple(self.memory)
+        shared = _block_cache.pop(self.image, None)
+        if shared is None:
+            shared = {}
+            if len(_block_cache) >= BLOCK_CACHE_SIZE:
+                del _block_cache[next(iter(_block_cache))]
+        _block_cache[self.image] = shared
+        # our own copy, so invalidating a block here doesn't affect other machines running the same program
+        self.blocks = dict(shared)
+        self.shared = shared
+        # address -> starts of the blocks that were compiled from it
+        self.owners = {}
+        for start, block in self.blocks.items():
+            self._own(start, block)
+
+    def _own(self, start, block):
+        for address in block.code:
+            self.owners.setdefault(address, set()).add(start)
+
+    def _invalidate(self, address):
+        for start in self.owners.pop(address, ()):
+            self.blocks.pop(start, None)
+
+    def _write(self, target, value):
+        self.memory[target] = value
+        if target in self.owners:
+            self._invalidate(target)
+
+    def _compile(self, start):
+        block = compile_block(self.memory, start)
+        self.blocks[start] = block
+        self._own(start, block)
+        # only blocks built from untouched code can be reused by other runs of the program
+        code = block.code
+        if self.memory[code.start:code.stop] == list(self.image[code.start:code.stop]):
+            self.shared[start] = block
+        return block
+
+    def run(self):
+        memory = self.memory
+        blocks = self.blocks
+        owners = self.owners
+        inputs = self.inputs
+        ip = self.ip
+        self.waiting = False
+
+        while True:
+            block = blocks.get(ip)
+            if block is None:
+                block = self._compile(ip)
+            ip = block.run(memory)
+            for target in block.writes:
+                if target in owners:
+                    self._invalidate(target)
+            if not block.stop:
+                continue
+
+            instruction, (mode1, _, _), _ = decode_instruction(memory[ip])
+            if instruction == 3:
+                if not inputs:
+                    self.ip = ip
+                    self.waiting = True
+                    return
+                target = memory[ip+1]
+                memory[target] = inputs.popleft()
+                if target in owners:
+                    self._invalidate(target)
+                ip += 2
+            elif instruction == 4:
+                value1 = memory[ip+1] if mode1 else memory[memory[ip+1]]
+                ip += 2
+                self.ip = ip
+                yield value1
+            elif instruction in (1, 2, 5, 6, 7, 8):
+                # the block patched the instruction it ended on, compile a new block from here
+                continue
+            else:
+                self.ip = ip
+                self.halted = True
+                return
+
+    __iter__ = run
+
+
+# small helper for the common case: run a program to completion and collect all of its outputs,
+# compiled=True runs it on a CompiledVM instead, compact=True uses Memory instead of a list, fuse=True turns on superinstructions.
+def run_program(program, inputs=(), compiled=False, compact=False, fuse=False):
+    vm = CompiledVM(program, inputs, compact) if compiled else IntcodeVM(program, inputs, compact, fuse)
+    return list(vm.run())
+
+
+# Run the program up to the point where it first asks for input, then try every candidate input from a fork of that state,
+# so the shared prefix only runs once. Returns {candidate: all outputs of that run}.
+def try_inputs(program, candidates):
+    vm = IntcodeVM(program)
+    prefix = list(vm.run())
+    start = vm.snapshot()
+    return {candidate: prefix + list(start.fork(candidate).run()) for candidate in candidates}
+
+
+# Day 2 style run: patch the noun and verb into addresses 1 and 2 of a copy of the template, run it and read address 0.
+# Programs that crash on a pair (e.g. a noun pointing outside of memory) just don't produce an answer for it.
+def run_noun_verb(template, noun, verb):
+    vm = IntcodeVM(template)
+    try:
+        vm.memory[1] = noun
+        vm.memory[2] = verb
+        for _ in vm.run():
+            pass
+    except IndexError:
+        return None
+    return vm.memory[0]
+
+
+# The noun/verb search gets sharded over a process pool. Every worker gets the parsed template once through the pool initializer,
+# plus a shared event that's set as soon as anyone finds the answer, so the others can stop early.
+_search_template = None
+_search_target = None
+_search_found = None
+
+def _init_search(template, target, found):
+    global _search_template, _search_target, _search_found
+    _search_template, _search_target, _search_found = template, target, found
+
+def _search_shard(shard):
+    nouns, verbs = shard
+    for noun in nouns:
+        # checking once per noun is plenty, a row is only a few hundred runs
+        if _search_found.is_set():
+            return None
+        for verb in verbs:
+            if run_noun_verb(_search_template, noun, verb) == _search_target:
+                _search_found.set()
+                return noun, verb
+    return None
+
+
+# Find a (noun, verb) pair in range(nouns) x range(verbs) that makes the program output target, or None if there isn't one.
+# workers=1 searches in this process, anything else spreads rows of nouns over a process pool (None = one per core).
+def find_noun_verb(program, target, nouns=100, verbs=100, workers=None):
+    template = tuple(program)
+    noun_range, verb_range = range(nouns), range(verbs)
+
+    if workers == 1:
+        for noun in noun_range:
+            for verb in verb_range:
+                if run_noun_verb(template, noun, verb) == target:
+                    return noun, verb
+        return None
+
+    workers = workers or multiprocessing.cpu_count()
+    # a few shards per worker, so a worker that finishes early can pick up more of the grid
+    shard_count = min(nouns, workers * 4) or 1
+    shards = [(noun_range[i::shard_count], verb_range) for i in range(shard_count)]
+    found = multiprocessing.Event()
+    with multiprocessing.Pool(workers, initializer=_init_search, initargs=(template, target, found)) as pool:
+        for result in pool.imap_unordered(_search_shard, shards):
+            if result is not None:
+                # leaving the with-block terminates the pool, so nothing keeps searching after this
+                return result
+    return None
+
+
+
+# Raised by the symbolic run when the output isn't an affine function of the symbols (or can't be proven to be).
+class NonAffine(Exception):
+    pass
+
+
+# Symbolic run of a day 2 style program: the cells at `symbols` hold unknowns instead of numbers, and we track every value as an
+# affine expression (constant, coefficient per symbol). Returns the expression that ends up at `output` once the program halts.
+# Reading through an unknown pointer gives an unknown value (None); that's fine as long as it never reaches the output,
+# an address, a jump or an opcode. Day 2 relies on that: its first instruction reads through the noun and verb, but the result
+# is overwritten straight after.
+def affine_output(program, symbols=(1, 2), output=0, max_steps=1000000):
+    width = len(symbols) + 1
+    memory = [(value,) + (0,) * (width - 1) for value in program]
+    for i, address in enumerate(symbols):
+        if not 0 <= address < len(memory):
+            raise NonAffine(f"symbol at {address} is outside of the program")
+        memory[address] = tuple(1 if j == i + 1 else 0 for j in range(width))
+
+    def concrete(expression):
+        if expression is None or any(expression[1:]):
+            raise NonAffine("symbolic value used as an address, jump or opcode")
+        return expression[0]
+
+    def read(address):
+        if not 0 <= address < len(memory):
+            raise NonAffine(f"read outside of memory at {address}")
+        return memory[address]
+
+    def parameter(ip, offset, mode):
+        value = read(ip + offset)
+        if mode:
+            return value
+        if value is None or any(value[1:]):
+            return None
+        return read(value[0])
+
+    ip = 0
+    for _ in range(max_steps):
+        instruction, (mode1, mode2, _), _ = decode_instruction(concrete(read(ip)))
+        if instruction in (1, 2, 7, 8):
+            value1 = parameter(ip, 1, mode1)
+            value2 = parameter(ip, 2, mode2)
+            target = concrete(read(ip + 3))
+            if not 0 <= target < len(memory):
+                raise NonAffine(f"write outside of memory at {target}")
+            if value1 is None or value2 is None:
+                result = None
+            elif instruction == 1:
+                result = tuple(a + b for a, b in zip(value1, value2))
+            elif instruction == 2:
+                # affine * affine is only affine if one of them is a plain number
+                if not any(value1[1:]):
+                    result = tuple(value1[0] * b for b in value2)
+                elif not any(value2[1:]):
+                    result = tuple(a * value2[0] for a in value1)
+                else:
+                    raise NonAffine("product of two symbolic values")
+            elif instruction == 7:
+                result = (1 if concrete(value1) < concrete(value2) else 0,) + (0,) * (width - 1)
+            else:
+                result = (1 if concrete(value1) == concrete(value2) else 0,) + (0,) * (width - 1)
+            memory[target] = result
+            ip += 4
+        elif instruction in (5, 6):
+            value1 = concrete(parameter(ip, 1, mode1))
+            if (value1 != 0) == (instruction == 5):
+                ip = concrete(parameter(ip, 2, mode2))
+            else:
+                ip += 3
+        elif instruction == 99:
+            result = read(output)
+            if result is None:
+                raise NonAffine("output depends on an unknown value")
+            return result
+        else:
+            # I/O (or garbage) isn't something the day 2 programs do
+            raise NonAffine(f"unsupported opcode {instruction} at {ip}")
+    raise NonAffine(f"no halt within {max_steps} steps")
+
+
+# Solve the day 2 question with the affine shortcut: one symbolic run gives output = c + a * noun + b * verb,
+# after which every noun just needs one division to find its verb. The first candidate gets double-checked with a real run
+# (the formula can't see crashes, like a noun that points outside of memory). Falls back to brute force if the program isn't affine.
+def solve_noun_verb(program, target, nouns=100, verbs=100, workers=None):
+    try:
+        c, a, b = affine_output(program)
+    except NonAffine:
+        return find_noun_verb(program, target, nouns, verbs, workers)
+
+    template = tuple(program)
+    for noun in range(nouns):
+        rest = target - c - a * noun
+        if b == 0:
+            candidates = range(verbs) if rest == 0 else ()
+        elif rest % b == 0 and 0 <= rest // b < verbs:
+            candidates = (rest // b,)
+        else:
+            candidates = ()
+        for verb in candidates:
+            if run_noun_verb(template, noun, verb) == target:
+                return noun, verb
+    return None
+
+
+# examples from the day 5 puzzle
+assert run_program([3,9,8,9,10,9,4,9,99,-1,8], [8]) == [1]
+assert run_program([3,3,1107,-1,8,3,4,3,99], [7]) == [1]
+assert run_program([3,12,6,12,15,1,13,14,13,4,13,99,-1,0,1,9], [0]) == [0]
+assert run_program([3,21,1008,21,8,20,1005,20,22,107,8,21,20,1006,20,31,1106,0,36,98,0,0,1002,21,125,20,4,20,1105,1,46,104,999,1105,1,46,1101,1000,1,20,4,20,1105,1,46,98,99], [9]) == [1001]
+
+assert run_program([3,21,1008,21,8,20,1005,20,22,107,8,21,20,1006,20,31,1106,0,36,98,0,0,1002,21,125,20,4,20,1105,1,46,104,999,1105,1,46,1101,1000,1,20,4,20,1105,1,46,98,99], [7], compiled=True) == [999]
+
+# a machine that echoes its input forever keeps its state between inputs
+assert list(IntcodeVM([3,9,4,9,1105,1,0,99,0,0]).stream(range(5))) == [0, 1, 2, 3, 4]
+
+# output = 2 * noun + 2 * verb, even though the first instruction reads through both of them
+assert affine_output([1,0,0,3,1,1,2,0,1,0,0,0,99]) == (0, 2, 2)
+assert solve_noun_verb([1,0,0,3,1,1,2,0,1,0,0,0,99], 10, nouns=10, verbs=10) == (0, 5)
+# too short to even hold a verb: not affine, and the brute force finds nothing either
+assert solve_noun_verb([1,0], 10, nouns=3, verbs=3, workers=1) is None
+
+# self-modifying loop: after the first round it patches its own "add 2" at address 4 into a "multiply by 2"
+assert run_program([1101,0,5,30,1001,31,2,31,4,31,1101,0,1002,4,1001,30,-1,30,1005,30,4,99,0,0,0,0,0,0,0,0,0,1], compiled=True) == [3, 6, 12, 24, 48]
+
+# the jump at address 18 of this loop is taken 4 times and falls through once
+_profile = Profile()
+assert list(IntcodeVM([1101,0,5,30,1001,31,2,31,4,31,1101,0,1002,4,1001,30,-1,30,1005,30,4,99,0,0,0,0,0,0,0,0,0,1]).profile(_profile)) == [3, 6, 12, 24, 48]
+assert _profile.branches == {18: [4, 1]} and _profile.instructions == 1 + 5 * 5
+
+# one shared prefix, three different inputs: below 8, equal to 8 and above 8
+assert try_inputs([3,21,1008,21,8,20,1005,20,22,107,8,21,20,1006,20,31,1106,0,36,98,0,0,1002,21,125,20,4,20,1105,1,46,104,999,1105,1,46,1101,1000,1,20,4,20,1105,1,46,98,99], [7, 8, 9]) == {7: [999], 8: [1000], 9: [1001]}
+
+# a snapshot of a CompiledVM forks into another CompiledVM, and isn't hashable
+_vm = CompiledVM([3,21,1008,21,8,20,1005,20,22,107,8,21,20,1006,20,31,1106,0,36,98,0,0,1002,21,125,20,4,20,1105,1,46,104,999,1105,1,46,1101,1000,1,20,4,20,1105,1,46,98,99])
+list(_vm.run())
+_fork = _vm.snapshot().fork(9)
+assert type(_fork) is CompiledVM and list(_fork.run()) == [1001] and Snapshot.__hash__ is None
+
+# writes far past the end of the program, and a value that needs more than 64 bits
+assert run_program([1101,0,7,10**9,4,10**9,1102,10**12,10**12,5,4,5,99], compact=True) == [7, 10**24]
+
+# both compares of the day 5 "compare to 8" example run as one superinstruction together with the jump on their flag
+_vm = IntcodeVM([3,21,1008,21,8,20,1005,20,22,107,8,21,20,1006,20,31,1106,0,36,98,0,0,1002,21,125,20,4,20,1105,1,46,104,999,1105,1,46,1101,1000,1,20,4,20,1105,1,46,98,99], [9], fuse=True)
+assert list(_vm.run()) == [1001] and _vm.fusion_stats["operate+jump"] == 2
+
+# the loader's chunk parser: negative values, a trailing newline, and a value that needs the slow path
+assert list(_parse_chunk(b"1,-2,3\n")) == [1, -2, 3]
+assert _parse_chunk(b"1," + str(10**30).encode()) == [1, 10**30]
+# an empty field is an error, not a 0 (NumPy alone would read this as [1, 2, 0])
+try:
+    _parse_chunk(b"1,2,\r")
+    assert False
+except ValueError:
+    pass
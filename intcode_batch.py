@@ -0,0 +1,144 @@
+"""
+Lockstep execution of many Intcode machines at once with NumPy.
+
+Every machine is a row of one 2-D int64 array. Machines whose instruction pointer and instruction match are stepped together
+with vectorized adds, multiplies and compares; when they branch differently they simply end up in different groups.
+Great for grid searches like day 2, where the same program runs thousands of times on slightly different memory.
+Note that values are int64 here, so unlike intcode.IntcodeVM this wraps around on overflow.
+"""
+import numpy as np
+
+from intcode import decode_instruction
+
+# machine states
+RUNNING, HALTED, WAITING, ERROR = 0, 1, 2, 3
+
+
+# N machines side by side. `inputs` is an optional (N, K) array (or list of lists) with every machine's input values;
+# a machine that wants more input than it has stops as WAITING, one that touches memory out of bounds stops as ERROR.
+class BatchVM:
+    def __init__(self, memories, inputs=None):
+        self.memory = np.array(memories, dtype=np.int64)
+        count, self.size = self.memory.shape
+        self.ip = np.zeros(count, dtype=np.int64)
+        self.status = np.full(count, RUNNING, dtype=np.int8)
+        self.outputs = [[] for _ in range(count)]
+        if inputs is None:
+            self.inputs = np.zeros((count, 0), dtype=np.int64)
+        else:
+            self.inputs = np.array(inputs, dtype=np.int64).reshape(count, -1)
+        self.input_pointer = np.zeros(count, dtype=np.int64)
+
+    def run(self, max_steps=1000000):
+        for _ in range(max_steps):
+            running = np.flatnonzero(self.status == RUNNING)
+            if running.size == 0:
+                break
+            # one group per instruction pointer, and within that one per instruction (self-modifying code can make them differ)
+            addresses, group_of = np.unique(self.ip[running], return_inverse=True)
+            for group, address in enumerate(addresses.tolist()):
+                rows = running[group_of == group]
+                if not 0 <= address < self.size:
+                    self.status[rows] = ERROR
+                    continue
+                words = self.memory[rows, address]
+                for word in np.unique(words).tolist():
+                    self._step(rows[words == word], address, word)
+        return self
+
+    # Drop (as ERROR) the rows that can't run the instruction at `address`: a parameter past the end of memory, or a position-mode
+    # parameter pointing outside of it. Writes always count as position mode. Returns the rows that are fine.
+    def _valid(self, rows, address, modes):
+        if address + len(modes) >= self.size:
+            self.status[rows] = ERROR
+            return rows[:0]
+        ok = np.ones(rows.size, dtype=bool)
+        for offset, mode in enumerate(modes, 1):
+            if not mode:
+                raw = self.memory[rows, address + offset]
+                ok &= (raw >= 0) & (raw < self.size)
+        self.status[rows[~ok]] = ERROR
+        return rows[ok]
+
+    def _value(self, rows, address, offset, mode):
+        if rows.size == 0:
+            return rows
+        raw = self.memory[rows, address + offset]
+        return raw if mode else self.memory[rows, raw]
+
+    # run one instruction for a group of machines that are all at `address` looking at the same instruction `word`
+    def _step(self, rows, address, word):
+        memory = self.memory
+        instruction, (mode1, mode2, _), _ = decode_instruction(word)
+
+        if instruction in (1, 2, 7, 8):
+            rows = self._valid(rows, address, (mode1, mode2, 0))
+            value1 = self._value(rows, address, 1, mode1)
+            value2 = self._value(rows, address, 2, mode2)
+            if instruction == 1:
+                result = value1 + value2
+            elif instruction == 2:
+                result = value1 * value2
+            elif instruction == 7:
+                result = (value1 < value2).astype(np.int64)
+            else:
+                result = (value1 == value2).astype(np.int64)
+            if rows.size:
+                memory[rows, memory[rows, address + 3]] = result
+            self.ip[rows] = address + 4
+
+        elif instruction == 3:
+            rows = self._valid(rows, address, (0,))
+            has_input = self.input_pointer[rows] < self.inputs.shape[1]
+            self.status[rows[~has_input]] = WAITING
+            rows = rows[has_input]
+            if rows.size == 0:
+                return
+            memory[rows, memory[rows, address + 1]] = self.inputs[rows, self.input_pointer[rows]]
+            self.input_pointer[rows] += 1
+            self.ip[rows] = address + 2
+
+        elif instruction == 4:
+            rows = self._valid(rows, address, (mode1,))
+            for row, value in zip(rows.tolist(), self._value(rows, address, 1, mode1).tolist()):
+                self.outputs[row].append(value)
+            self.ip[rows] = address + 2
+
+        elif instruction in (5, 6):
+            rows = self._valid(rows, address, (mode1,))
+            value1 = self._value(rows, address, 1, mode1)
+            jump = value1 != 0 if instruction == 5 else value1 == 0
+            self.ip[rows[~jump]] = address + 3
+            # like the interpreter, the target is only read (and only has to be valid) when the jump is taken
+            rows = self._valid(rows[jump], address, (mode1, mode2))
+            self.ip[rows] = self._value(rows, address, 2, mode2)
+
+        else:
+            self.status[rows] = HALTED
+
+
+# Day 2 part 2 in a handful of vectorized passes: every (noun, verb) pair in the grid is a row,
+# and the answer is the first row that halts cleanly with `target` at address 0.
+def batch_noun_verb(program, target, nouns=100, verbs=100):
+    noun_grid, verb_grid = np.meshgrid(np.arange(nouns), np.arange(verbs), indexing="ij")
+    memories = np.tile(np.array(program, dtype=np.int64), (nouns * verbs, 1))
+    memories[:, 1] = noun_grid.ravel()
+    memories[:, 2] = verb_grid.ravel()
+    vm = BatchVM(memories).run()
+    hits = np.flatnonzero((vm.status == HALTED) & (vm.memory[:, 0] == target))
+    if hits.size == 0:
+        return None
+    return int(noun_grid.ravel()[hits[0]]), int(verb_grid.ravel()[hits[0]])
+
+
+# Run one program once per input sequence (e.g. every system ID for a day 5 style diagnostic), returns every run's outputs.
+def sweep_inputs(program, input_rows):
+    input_rows = np.array(input_rows, dtype=np.int64).reshape(len(input_rows), -1)
+    memories = np.tile(np.array(program, dtype=np.int64), (len(input_rows), 1))
+    return BatchVM(memories, input_rows).run().outputs
+
+
+assert sweep_inputs([3,21,1008,21,8,20,1005,20,22,107,8,21,20,1006,20,31,1106,0,36,98,0,0,1002,21,125,20,4,20,1105,1,46,104,999,1105,1,46,1101,1000,1,20,4,20,1105,1,46,98,99], [[7], [8], [9]]) == [[999], [1000], [1001]]
+assert batch_noun_verb([1,0,0,3,1,1,2,0,1,0,0,0,99], 10, nouns=10, verbs=10) == (0, 5)
+# the jump isn't taken, so its target (far outside of memory) never gets read
+assert sweep_inputs([105,0,1000,104,7,99], [[]]) == [[7]]
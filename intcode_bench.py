@@ -0,0 +1,219 @@
+"""
+Benchmark and regression harness for the Intcode interpreters in intcode.py.
+
+Runs every program in the corpus (the day 2 and day 5 inputs, the example programs from the puzzle texts and some generated
+loop-heavy programs) on each interpreter variant and measures instructions per second, wall time and peak memory.
+Also times the bulk loader on a generated multi-MB program file.
+Results can be saved as JSON, and compared against an earlier run to fail when throughput drops too much.
+
+Usage: python intcode_bench.py [--output results.json] [--baseline old.json] [--threshold 0.2] [--min-time 0.2] [--load-values 2000000]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from intcode import IntcodeVM, CompiledVM, Profile, LoadStats, load_program
+
+
+def load(path):
+    return list(load_program(path))
+
+
+# Synthetic loop-heavy program: counts down from `iterations`, doing a bit of arithmetic and a compare every round,
+# then outputs the accumulator. Memory 100-103 holds counter, accumulator, scratch and a flag.
+def countdown_program(iterations):
+    program = [
+        1101, 0, iterations, 100,   # 0: counter = iterations
+        1001, 101, 3, 101,          # 4: acc += 3
+        1002, 101, 2, 102,          # 8: scratch = acc * 2
+        7, 102, 100, 103,           # 12: flag = scratch < counter
+        1001, 100, -1, 100,         # 16: counter -= 1
+        1005, 100, 4,               # 20: if counter: goto 4
+        4, 101,                     # 23: output acc
+        99,                         # 25
+    ]
+    return program + [0] * (104 - len(program))
+
+
+# Two nested countdown loops, so most time goes to the short inner block and its back-edge.
+def nested_program(outer, inner):
+    program = [
+        1101, 0, outer, 100,        # 0: i = outer
+        1101, 0, inner, 101,        # 4: j = inner
+        1001, 102, 1, 102,          # 8: acc += 1
+        1001, 101, -1, 101,         # 12: j -= 1
+        1005, 101, 8,               # 16: if j: goto 8
+        1001, 100, -1, 100,         # 19: i -= 1
+        1005, 100, 4,               # 23: if i: goto 4
+        4, 102,                     # 26: output acc
+        99,                         # 28
+    ]
+    return program + [0] * (103 - len(program))
+
+
+# example programs from the puzzle texts, with the input they're run with
+EXAMPLES = {
+    "day2 example": ([1,9,10,3,2,3,11,0,99,30,40,50], []),
+    "day2 1,0,0,0,99": ([1,0,0,0,99], []),
+    "day2 2,3,0,3,99": ([2,3,0,3,99], []),
+    "day2 2,4,4,5,99,0": ([2,4,4,5,99,0], []),
+    "day2 1,1,1,4,99,5,6,0,99": ([1,1,1,4,99,5,6,0,99], []),
+    "day5 echo": ([3,0,4,0,99], [42]),
+    "day5 1002,4,3,4,33": ([1002,4,3,4,33], []),
+    "day5 1101,100,-1,4,0": ([1101,100,-1,4,0], []),
+    "day5 equal 8 (position)": ([3,9,8,9,10,9,4,9,99,-1,8], [8]),
+    "day5 less than 8 (position)": ([3,9,7,9,10,9,4,9,99,-1,8], [7]),
+    "day5 equal 8 (immediate)": ([3,3,1108,-1,8,3,4,3,99], [8]),
+    "day5 less than 8 (immediate)": ([3,3,1107,-1,8,3,4,3,99], [7]),
+    "day5 jump (position)": ([3,12,6,12,15,1,13,14,13,4,13,99,-1,0,1,9], [0]),
+    "day5 jump (immediate)": ([3,3,1105,-1,9,1101,0,0,12,4,12,99,1], [1]),
+    "day5 compare to 8": ([3,21,1008,21,8,20,1005,20,22,107,8,21,20,1006,20,31,1106,0,36,98,0,0,1002,21,125,20,4,20,1105,1,46,104,999,1105,1,46,1101,1000,1,20,4,20,1105,1,46,98,99], [9]),
+}
+
+
+# name -> (program, inputs)
+def corpus():
+    day2 = load("input/day2.txt")
+    day2[1], day2[2] = 12, 2
+    day5 = load("input/day5.txt")
+    programs = {
+        "day2 (1202)": (day2, []),
+        "day5 (ID 1)": (day5, [1]),
+        "day5 (ID 5)": (day5, [5]),
+    }
+    programs.update(EXAMPLES)
+    programs["countdown 100k"] = (countdown_program(100000), [])
+    programs["nested 300x300"] = (nested_program(300, 300), [])
+    return programs
+
+
+VARIANTS = {
+    "interpreter": IntcodeVM,
+    "compiled": CompiledVM,
+    "compact": lambda program, inputs: IntcodeVM(program, inputs, compact=True),
+    "fused": lambda program, inputs: IntcodeVM(program, inputs, fuse=True),
+}
+
+
+def run(make_vm, program, inputs):
+    vm = make_vm(program, inputs)
+    outputs = list(vm.run())
+    return outputs, vm
+
+
+# Time one program on one variant: keep running it until at least `min_time` has passed (tiny example programs need thousands
+# of runs to be measurable), then one extra traced run for the peak memory.
+def measure(make_vm, program, inputs, instructions, min_time):
+    runs = 0
+    start = time.perf_counter()
+    while True:
+        run(make_vm, program, inputs)
+        runs += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+    seconds = elapsed / runs
+
+    tracemalloc.start()
+    run(make_vm, program, inputs)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "instructions": instructions,
+        "seconds": seconds,
+        "ips": instructions / seconds,
+        "peak_bytes": peak,
+    }
+
+
+def benchmark(min_time):
+    results = {}
+    for name, (program, inputs) in corpus().items():
+        # count the instructions once with the profiler, and use the plain interpreter as the reference answer
+        profile = Profile()
+        list(IntcodeVM(program, inputs).profile(profile))
+        expected = run(IntcodeVM, program, inputs)
+        results[name] = {}
+        for variant, make_vm in VARIANTS.items():
+            outputs, vm = run(make_vm, program, inputs)
+            if outputs != expected[0] or list(vm.memory) != list(expected[1].memory):
+                raise AssertionError(f"{variant} gives a different result on {name}")
+            results[name][variant] = measure(make_vm, program, inputs, profile.instructions, min_time)
+            if vm.fuse:
+                results[name][variant]["fusion"] = vm.fusion_stats
+    return results
+
+
+# Write a program file of `values` random integers (negative ones included) and load it back, for the loader's MB/s.
+def benchmark_loader(values):
+    rng = random.Random(0)
+    with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as program_file:
+        program_file.write(",".join(str(rng.randint(-10**6, 10**6)) for _ in range(values)) + "\n")
+    try:
+        stats = LoadStats()
+        load_program(program_file.name, stats)
+    finally:
+        os.remove(program_file.name)
+    return {"bytes": stats.bytes, "values": stats.values, "seconds": stats.seconds, "mb_per_second": stats.mb_per_second}
+
+
+# every (program, variant) whose throughput dropped more than `threshold` (a fraction) below the baseline
+def regressions(results, baseline, threshold):
+    found = []
+    for name, variants in results.items():
+        for variant, result in variants.items():
+            old = baseline.get(name, {}).get(variant)
+            if old and result["ips"] < old["ips"] * (1 - threshold):
+                found.append((name, variant, old["ips"], result["ips"]))
+    return found
+
+
+def report(results):
+    lines = [f"{'program':<30} {'variant':<12} {'instructions':>12} {'time (ms)':>10} {'M instr/s':>10} {'peak KiB':>9}"]
+    for name, variants in results.items():
+        for variant, result in variants.items():
+            lines.append(f"{name:<30} {variant:<12} {result['instructions']:>12} {result['seconds'] * 1000:>10.3f} "
+                         f"{result['ips'] / 1e6:>10.2f} {result['peak_bytes'] / 1024:>9.1f}")
+    # how many instruction pairs the superinstructions covered, per program
+    lines.append("")
+    lines.append(f"{'program':<30} {'operate+jump':>12} {'add/mul pair':>12} {'fallback':>9}")
+    for name, variants in results.items():
+        fusion = variants.get("fused", {}).get("fusion")
+        if fusion:
+            lines.append(f"{name:<30} {fusion['operate+jump']:>12} {fusion['add/mul pair']:>12} {fusion['fallback']:>9}")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the Intcode interpreters.")
+    parser.add_argument("--output", help="save the results to this JSON file")
+    parser.add_argument("--baseline", help="JSON file from an earlier run to compare throughput against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed drop in instructions/s, as a fraction (default 0.2)")
+    parser.add_argument("--min-time", type=float, default=0.2, help="seconds to spend timing each program/variant (default 0.2)")
+    parser.add_argument("--load-values", type=int, default=2000000, help="size of the program file for the loader benchmark (default 2000000)")
+    args = parser.parse_args()
+
+    results = benchmark(args.min_time)
+    print(report(results))
+    loader = benchmark_loader(args.load_values)
+    print(f"\nloader: {loader['bytes'] / 1e6:.1f} MB ({loader['values']} values) in {loader['seconds']:.3f} s, "
+          f"{loader['mb_per_second']:.1f} MB/s")
+
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump({"results": results, "loader": loader}, output_file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)["results"]
+        found = regressions(results, baseline, args.threshold)
+        for name, variant, old, new in found:
+            print(f"REGRESSION {name} / {variant}: {old / 1e6:.2f} -> {new / 1e6:.2f} M instr/s")
+        if found:
+            sys.exit(1)
@@ -0,0 +1,95 @@
+"""
+Memoizing cache for Intcode runs.
+
+Running the same program on the same inputs always gives the same outputs, so ResultCache keys every run by the initial memory
+image and the input sequence and keeps the outputs: an LRU in memory, optionally backed by an SQLite file on disk so results
+survive restarts. Hits and misses are counted to see whether the cache pays off.
+"""
+import hashlib
+import json
+import sqlite3
+from array import array
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from intcode import run_program
+
+
+# Hash of a list of integers, for the disk store. Packing them into an array is a lot faster than formatting strings;
+# only values that don't fit in 64 bits need the slow path.
+def digest(values):
+    try:
+        data = array("q", values).tobytes()
+    except OverflowError:
+        data = ",".join(map(str, values)).encode()
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    disk_hits: int = 0
+    misses: int = 0
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.disk_hits + self.misses
+        return (self.hits + self.disk_hits) / total if total else 0.0
+
+
+class ResultCache:
+    def __init__(self, maxsize=1024, path=None):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.stats = CacheStats()
+        self.db = None
+        if path is not None:
+            self.db = sqlite3.connect(path)
+            self.db.execute("CREATE TABLE IF NOT EXISTS results (key BLOB PRIMARY KEY, outputs TEXT)")
+
+    # In memory the key is simply the program and inputs as tuples: Python hashes those quickly and compares them in full on a hit,
+    # so there's no chance of collisions. The disk store uses a digest of both instead, computed only when it's needed.
+    def run(self, program, inputs=()):
+        key = (tuple(program), tuple(inputs))
+        outputs = self.entries.get(key)
+        if outputs is not None:
+            self.entries.move_to_end(key)
+            self.stats.hits += 1
+            return list(outputs)
+
+        if self.db is not None:
+            disk_key = digest(program) + digest(inputs)
+            row = self.db.execute("SELECT outputs FROM results WHERE key = ?", (disk_key,)).fetchone()
+            if row is not None:
+                outputs = tuple(json.loads(row[0]))
+                self.stats.disk_hits += 1
+                self._remember(key, outputs)
+                return list(outputs)
+
+        self.stats.misses += 1
+        outputs = tuple(run_program(program, inputs))
+        self._remember(key, outputs)
+        if self.db is not None:
+            with self.db:
+                self.db.execute("INSERT OR REPLACE INTO results VALUES (?, ?)", (disk_key, json.dumps(outputs)))
+        return list(outputs)
+
+    def _remember(self, key, outputs):
+        self.entries[key] = outputs
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        self.entries.clear()
+
+    def close(self):
+        if self.db is not None:
+            self.db.close()
+            self.db = None
+
+
+_cache = ResultCache(maxsize=3)
+assert _cache.run([3,9,8,9,10,9,4,9,99,-1,8], [8]) == [1]
+assert _cache.run([3,9,8,9,10,9,4,9,99,-1,8], [8]) == [1]
+assert _cache.run([3,9,8,9,10,9,4,9,99,-1,8], [7]) == [0]
+assert (_cache.stats.hits, _cache.stats.misses) == (1, 2)
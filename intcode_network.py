@@ -0,0 +1,159 @@
+"""
+Networks of Intcode machines connected by async queues.
+
+Every machine runs as an asyncio task. Its outputs go into the input queues of the machines it's connected to, and when it hits
+opcode 3 with nothing queued it awaits its own input queue, so only that task waits and no OS thread is held.
+Chains, rings and arbitrary graphs are all built from the same connect() call. Queues are bounded, so a fast producer
+waits for a slow consumer instead of piling up memory.
+"""
+import asyncio
+import time
+from dataclasses import dataclass, field
+
+from intcode import IntcodeVM
+
+
+@dataclass
+class NodeStats:
+    inputs: int = 0
+    outputs: int = 0
+    # time spent running the machine itself, and time spent waiting for input or for room in a full output queue
+    busy: float = 0.0
+    waiting: float = 0.0
+    started: float = None
+    finished: float = None
+
+    @property
+    def throughput(self):
+        elapsed = (self.finished or time.perf_counter()) - (self.started or time.perf_counter())
+        return self.outputs / elapsed if elapsed > 0 else 0.0
+
+
+@dataclass
+class Node:
+    name: object
+    vm: IntcodeVM
+    queue: asyncio.Queue
+    targets: list = field(default_factory=list)
+    stats: NodeStats = field(default_factory=NodeStats)
+    # every value this node produced, for reading results afterwards
+    produced: list = field(default_factory=list)
+
+
+class Network:
+    def __init__(self, queue_size=64):
+        self.queue_size = queue_size
+        self.nodes = {}
+        self.running = False
+
+    # add a machine running `program`; `inputs` are queued up front (phase settings and the like)
+    def add(self, name, program, inputs=()):
+        node = Node(name, IntcodeVM(program), asyncio.Queue(self.queue_size))
+        node.vm.feed(*inputs)
+        self.nodes[name] = node
+        return node
+
+    # every output of `source` gets sent to `target`
+    def connect(self, source, target):
+        self.nodes[source].targets.append(self.nodes[target].queue)
+
+    # Put a value into a machine's input queue from outside the network. While the network isn't running nothing empties
+    # the bounded queues, so until then values go straight into the machine's own input (after anything still queued)
+    # and send() never blocks, however many values are sent up front.
+    async def send(self, name, value):
+        node = self.nodes[name]
+        if self.running:
+            await node.queue.put(value)
+            return
+        while not node.queue.empty():
+            node.vm.feed(node.queue.get_nowait())
+        node.vm.feed(value)
+
+    # busy and waiting time add up as the machine runs, so they're current for machines that never halt as well,
+    # and `finished` is set however the task ends (halted, or cancelled by a timeout)
+    async def _run_node(self, node):
+        vm, stats = node.vm, node.stats
+        stats.started = mark = time.perf_counter()
+        try:
+            while True:
+                # outputs are passed on one at a time as the machine produces them, the generator just pauses while we await
+                for value in vm.run():
+                    now = time.perf_counter()
+                    stats.busy += now - mark
+                    stats.outputs += 1
+                    node.produced.append(value)
+                    for queue in node.targets:
+                        await queue.put(value)
+                    mark = time.perf_counter()
+                    stats.waiting += mark - now
+                now = time.perf_counter()
+                stats.busy += now - mark
+                if vm.halted:
+                    break
+                value = await node.queue.get()
+                mark = time.perf_counter()
+                stats.waiting += mark - now
+                vm.feed(value)
+                stats.inputs += 1
+        finally:
+            stats.finished = time.perf_counter()
+            # the machine only runs between awaits, so a cancelled task was waiting since the last mark
+            stats.waiting = stats.finished - stats.started - stats.busy
+
+    # Run every machine until all of them halt. Machines that are still waiting for input once everything else is done
+    # would wait forever, so `timeout` (seconds) puts a limit on the whole run.
+    async def run(self, timeout=None):
+        self.running = True
+        tasks = [asyncio.create_task(self._run_node(node)) for node in self.nodes.values()]
+        try:
+            await asyncio.wait_for(asyncio.gather(*tasks), timeout)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self.running = False
+        return self
+
+    def stats(self):
+        return {name: node.stats for name, node in self.nodes.items()}
+
+
+# Machines 0..n-1 each running `program` with their own setting as first input, every one feeding the next.
+# With ring=True the last one feeds back into the first (like the day 7 amplifier feedback loop).
+def chain(program, settings, ring=False, queue_size=64):
+    network = Network(queue_size)
+    for i, setting in enumerate(settings):
+        network.add(i, program, [setting])
+    for i in range(len(settings) - 1):
+        network.connect(i, i + 1)
+    if ring:
+        network.connect(len(settings) - 1, 0)
+    return network
+
+
+# Send `signal` into the first machine of a chain (or ring) and return the last value the final machine produced.
+async def run_chain_async(program, settings, signal=0, ring=False):
+    network = chain(program, settings, ring)
+    await network.send(0, signal)
+    await network.run()
+    return network.nodes[len(settings) - 1].produced[-1]
+
+
+# the same from synchronous code; inside an event loop, await run_chain_async instead
+def run_chain(program, settings, signal=0, ring=False):
+    return asyncio.run(run_chain_async(program, settings, signal, ring))
+
+
+def _running_in_loop():
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+# amplifier examples from day 7: a plain chain, and a feedback loop.
+# They need an event loop of their own, so they're skipped when this module gets imported from async code.
+if not _running_in_loop():
+    assert run_chain([3,15,3,16,1002,16,10,16,1,16,15,15,4,15,99,0,0], [4,3,2,1,0]) == 43210
+    assert run_chain([3,26,1001,26,-4,26,3,27,1002,27,2,27,1,27,26,27,4,27,1001,28,-1,28,1005,28,6,99,0,0,5], [9,8,7,6,5], ring=True) == 139629729
@@ -0,0 +1,277 @@
+"""
+Static analysis and partial evaluation of Intcode programs.
+
+Finds the reachable code and every address the program can write to, folds parameters that read never-written addresses into
+immediate values, follows jumps whose outcome is then fixed, and trims the memory that nothing reaches anymore. With a fixed set of inputs the
+optimized program is also run once, and the outputs become its closed-form result.
+Results are cached by program hash and inputs, so repeated diagnostic runs only pay for a dictionary lookup.
+"""
+import hashlib
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+
+from intcode import IntcodeVM, decode_instruction
+
+MNEMONICS = {1: "add", 2: "mul", 3: "in", 4: "out", 5: "jnz", 6: "jz", 7: "lt", 8: "eq", 99: "halt"}
+
+
+# Raised when the program can't be analyzed statically, e.g. because it modifies its own code or jumps to a computed address.
+class Unanalyzable(Exception):
+    pass
+
+
+@dataclass
+class Instruction:
+    address: int
+    opcode: int
+    modes: tuple
+    params: tuple
+
+    @property
+    def length(self):
+        return len(self.params) + 1
+
+    # parameters this instruction reads, as (offset, mode, value)
+    def reads(self):
+        count = {1: 2, 2: 2, 4: 1, 5: 2, 6: 2, 7: 2, 8: 2}.get(self.opcode, 0)
+        return [(i + 1, self.modes[i], self.params[i]) for i in range(count)]
+
+    # the address this instruction writes to, if any (writes are always position mode)
+    def write(self):
+        if self.opcode in (1, 2, 7, 8):
+            return self.params[2]
+        if self.opcode == 3:
+            return self.params[0]
+        return None
+
+    def __str__(self):
+        def show(mode, value):
+            return str(value) if mode else f"[{value}]"
+        args = [show(mode, value) for _, mode, value in self.reads()]
+        if self.write() is not None:
+            args.append(f"-> [{self.write()}]")
+        return f"{self.address:>6}: {MNEMONICS.get(self.opcode, '???'):<4} " + " ".join(args)
+
+
+def decode_at(program, address):
+    opcode, modes, length = decode_instruction(program[address])
+    if address + length > len(program):
+        raise Unanalyzable(f"instruction at {address} runs past the end of the program")
+    return Instruction(address, opcode, modes, tuple(program[address+1:address+length]))
+
+
+# Walk every path from address 0 and collect the reachable instructions. Jumps with a position-mode target are followed through
+# the value that's there now; `analyze` checks afterwards that nothing can overwrite it.
+# With fold_branches, a jump whose condition is an immediate value only follows the way it actually goes.
+def reachable_instructions(program, fold_branches=False):
+    found = {}
+    todo = [0]
+    while todo:
+        address = todo.pop()
+        while address not in found:
+            if not 0 <= address < len(program):
+                raise Unanalyzable(f"jump to {address}, outside of the program")
+            instruction = decode_at(program, address)
+            found[address] = instruction
+            if instruction.opcode not in MNEMONICS or instruction.opcode == 99:
+                break
+            if instruction.opcode in (5, 6):
+                (_, mode1, condition), (_, mode2, target) = instruction.reads()
+                if not mode2:
+                    if not 0 <= target < len(program):
+                        raise Unanalyzable(f"jump at {address} reads its target outside of the program")
+                    target = program[target]
+                if fold_branches and mode1:
+                    taken = (condition != 0) == (instruction.opcode == 5)
+                    if taken:
+                        address = target
+                        continue
+                else:
+                    todo.append(target)
+            address += instruction.length
+    return dict(sorted(found.items()))
+
+
+@dataclass
+class Analysis:
+    instructions: dict
+    writes: set
+
+    def disassembly(self):
+        return "\n".join(str(instruction) for instruction in self.instructions.values())
+
+
+# Disassemble the program and work out which addresses it can write to. Writes into code are only allowed when they can't change
+# what runs: in a program that only ever jumps forward, instructions run in address order, so overwriting an instruction that
+# already ran (like day 2 reusing its first instruction's parameters as scratch space) is harmless.
+def analyze(program):
+    instructions = reachable_instructions(program)
+    writes = {instruction.write() for instruction in instructions.values()} - {None}
+    owner = {}
+    for instruction in instructions.values():
+        for address in range(instruction.address, instruction.address + instruction.length):
+            if address in owner:
+                raise Unanalyzable(f"instructions at {owner[address]} and {instruction.address} overlap")
+            owner[address] = instruction.address
+    forward_only = all(instruction.params[1] > instruction.address
+                       for instruction in instructions.values() if instruction.opcode in (5, 6) and instruction.modes[1])
+    forward_only = forward_only and not any(instruction.opcode in (5, 6) and not instruction.modes[1]
+                                            for instruction in instructions.values())
+    for instruction in instructions.values():
+        addresses = [value for _, mode, value in instruction.reads() if not mode]
+        if instruction.write() is not None:
+            addresses.append(instruction.write())
+        if any(not 0 <= address < len(program) for address in addresses):
+            raise Unanalyzable(f"instruction at {instruction.address} uses an address outside of the program")
+        target = instruction.write()
+        if target in owner and not (forward_only and owner[target] <= instruction.address):
+            raise Unanalyzable(f"instruction at {instruction.address} writes into the code at {target}")
+        if instruction.opcode in (5, 6) and not instruction.modes[1] and instruction.params[1] in writes:
+            raise Unanalyzable(f"jump at {instruction.address} goes to a computed address")
+    return Analysis(instructions, writes)
+
+
+# Fold every parameter that reads an address nothing writes to into an immediate value (those addresses are constants),
+# then trim memory after the last address the folded program still executes, reads or writes.
+# The result produces the same outputs as the original for any input; only its final memory image differs.
+def fold_constants(program):
+    analysis = analyze(program)
+    # cells the program reads as data have to keep their value, even if they're part of an instruction
+    data = {value for instruction in analysis.instructions.values() for _, mode, value in instruction.reads() if not mode}
+    folded = list(program)
+    for instruction in analysis.instructions.values():
+        if instruction.address in data:
+            continue
+        word = program[instruction.address]
+        for offset, mode, value in instruction.reads():
+            if instruction.address + offset in data:
+                continue
+            if not mode and 0 <= value < len(program) and value not in analysis.writes:
+                folded[instruction.address + offset] = program[value]
+                word += 10 ** (offset + 1)
+        folded[instruction.address] = word
+
+    # with the constants in place some jumps always (or never) go one way, which can make code and data unreachable
+    live = reachable_instructions(folded, fold_branches=True)
+    needed = [0]
+    for instruction in live.values():
+        needed.append(instruction.address + instruction.length - 1)
+        needed += [value for _, mode, value in instruction.reads() if not mode]
+        if instruction.write() is not None:
+            needed.append(instruction.write())
+    return folded[:max(needed) + 1], live
+
+
+@dataclass
+class Optimized:
+    program: list
+    # the outputs for the inputs it was specialized for, when it runs to completion on them
+    outputs: list = None
+
+
+# optimized programs per (program hash, inputs, max_steps); only the most recently used ones are kept, like intcode._block_cache
+_optimized = OrderedDict()
+OPTIMIZED_CACHE_SIZE = 256
+
+
+def program_hash(program):
+    return hashlib.sha256(",".join(map(str, program)).encode()).hexdigest()
+
+
+# Run `program` on `inputs` for at most max_steps instructions: a plain interpreter loop like IntcodeVM.run(), plus a step counter.
+# Returns the outputs if it halts in time, None if it runs too long, asks for more input than it got, or crashes.
+def run_bounded(program, inputs, max_steps=1000000):
+    memory = list(program)
+    inputs = deque(inputs)
+    outputs = []
+    # decoded instructions per address, dropped when something writes there (like IntcodeVM.decoded)
+    decoded = {}
+    ip = 0
+    try:
+        for _ in range(max_steps):
+            entry = decoded.get(ip)
+            if entry is None:
+                entry = decoded[ip] = decode_instruction(memory[ip])
+            instruction, (mode1, mode2, _), _ = entry
+            if instruction in (1, 2, 7, 8):
+                value1 = memory[ip+1] if mode1 else memory[memory[ip+1]]
+                value2 = memory[ip+2] if mode2 else memory[memory[ip+2]]
+                if instruction == 1:
+                    result = value1 + value2
+                elif instruction == 2:
+                    result = value1 * value2
+                elif instruction == 7:
+                    result = 1 if value1 < value2 else 0
+                else:
+                    result = 1 if value1 == value2 else 0
+                target = memory[ip+3]
+                memory[target] = result
+                decoded.pop(target, None)
+                ip += 4
+            elif instruction == 3:
+                if not inputs:
+                    return None
+                target = memory[ip+1]
+                memory[target] = inputs.popleft()
+                decoded.pop(target, None)
+                ip += 2
+            elif instruction == 4:
+                outputs.append(memory[ip+1] if mode1 else memory[memory[ip+1]])
+                ip += 2
+            elif instruction in (5, 6):
+                value1 = memory[ip+1] if mode1 else memory[memory[ip+1]]
+                if (value1 != 0) == (instruction == 5):
+                    ip = memory[ip+2] if mode2 else memory[memory[ip+2]]
+                else:
+                    ip += 3
+            else:
+                return outputs
+    except IndexError:
+        return None
+    return None
+
+
+# Optimize `program`, and if `inputs` are given, specialize it for them. With every input known the run is fully determined,
+# so if the program halts on them within max_steps instructions the closed-form result is just its outputs, and the specialized
+# program is a plain list of output instructions. Otherwise (it runs too long, asks for more input or crashes) the constant-folded
+# program is returned, or the original if it can't be analyzed; the day 5 diagnostic for example patches the instruction at
+# address 6 with its input.
+def optimize(program, inputs=None, max_steps=1000000):
+    key = (program_hash(program), None if inputs is None else tuple(inputs), max_steps)
+    if key in _optimized:
+        _optimized.move_to_end(key)
+        return _optimized[key]
+
+    result = None
+    if inputs is not None:
+        outputs = run_bounded(program, inputs, max_steps)
+        if outputs is not None:
+            specialized = [word for output in outputs for word in (104, output)] + [99]
+            result = Optimized(specialized, outputs)
+    if result is None:
+        try:
+            folded, _ = fold_constants(program)
+        except Unanalyzable:
+            folded = list(program)
+        result = Optimized(folded)
+    _optimized[key] = result
+    if len(_optimized) > OPTIMIZED_CACHE_SIZE:
+        _optimized.popitem(last=False)
+    return result
+
+
+# outputs of `program` on `inputs`, straight from the cache after the first time
+def run_optimized(program, inputs):
+    result = optimize(program, inputs)
+    if result.outputs is not None:
+        return result.outputs
+    return list(IntcodeVM(result.program, inputs).run())
+
+
+# both compares read the input at address 9 (written) and the 8 at address 10 (never written, so it becomes an immediate)
+assert fold_constants([3,9,8,9,10,9,4,9,99,-1,8])[0] == [3,9,1008,9,8,9,4,9,99,-1]
+assert run_optimized([3,9,8,9,10,9,4,9,99,-1,8], [8]) == [1]
+assert optimize([3,9,8,9,10,9,4,9,99,-1,8], [7]).program == [104,0,99]
+# never halts (or asks for input), and crashes reading address 100: both just come back folded
+assert optimize([1105,1,0], [1], max_steps=1000).outputs is None
+assert optimize([1,100,0,0,99], []).outputs is None
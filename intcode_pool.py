@@ -0,0 +1,126 @@
+"""
+Warm pool of Intcode machines for serving many runs of the same few programs.
+
+Every program is parsed and decoded once, into a template (a Snapshot of a machine that hasn't run yet). A request forks a fresh
+machine from its template, which only copies the memory and the decode cache, and runs it with the request's inputs on a
+thread or process pool. submit() returns a future with the outputs. The pool keeps track of how many requests are queued
+or running and how long they took from submit to result, so it can be sized under load.
+
+Threads share the GIL, so they only help when callers do other work while waiting; processes=True runs machines in parallel.
+Worker processes get the templates once when they start, so requests only send a name and the inputs.
+"""
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+from intcode import Snapshot, decode_instruction
+
+
+# A machine at address 0 with nothing run yet, and every address decoded up front. Decoding data as if it were an instruction
+# is harmless: the entry is only used if the program jumps there, and it's dropped as soon as something writes to it.
+def make_template(program):
+    program = tuple(program)
+    decoded = {address: decode_instruction(value) for address, value in enumerate(program)}
+    return Snapshot(program, 0, (), decoded, False, False)
+
+
+def run_template(template, inputs):
+    vm = template.fork(*inputs)
+    outputs = list(vm.run())
+    if vm.waiting:
+        raise ValueError(f"program wants more input than the {len(inputs)} values it got")
+    return outputs
+
+
+# worker process state, filled in by the pool initializer (same idea as the noun/verb search in intcode.py)
+_worker_templates = None
+
+def _init_worker(templates):
+    global _worker_templates
+    _worker_templates = templates
+
+def _run_named(name, inputs):
+    return run_template(_worker_templates[name], inputs)
+
+
+@dataclass
+class PoolStats:
+    submitted: int = 0
+    completed: int = 0
+    failed: int = 0
+    # submit-to-result time in seconds of the most recent requests
+    latencies: deque = field(default_factory=lambda: deque(maxlen=10000))
+
+    # requests that are waiting for a worker or running right now
+    @property
+    def queue_depth(self):
+        return self.submitted - self.completed - self.failed
+
+    # latency below which `percent` % of the recent requests finished (nearest rank)
+    def percentile(self, percent):
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))]
+
+    def report(self):
+        return (f"submitted {self.submitted}, completed {self.completed}, failed {self.failed}, queued {self.queue_depth}, "
+                f"latency p50 {self.percentile(50) * 1000:.2f} ms, p90 {self.percentile(90) * 1000:.2f} ms, "
+                f"p99 {self.percentile(99) * 1000:.2f} ms")
+
+
+# Pool serving the programs in `programs` (name -> program). workers=None lets the executor pick its default size.
+class VMPool:
+    def __init__(self, programs, workers=None, processes=False):
+        self.templates = {name: make_template(program) for name, program in programs.items()}
+        self.processes = processes
+        if processes:
+            self.executor = ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(self.templates,))
+        else:
+            self.executor = ThreadPoolExecutor(workers)
+        self.stats = PoolStats()
+        self.lock = threading.Lock()
+
+    # run program `name` on `inputs` in the pool, returns a future with its outputs
+    def submit(self, name, inputs=()):
+        if name not in self.templates:
+            raise KeyError(f"unknown program {name!r}")
+        inputs = tuple(inputs)
+        with self.lock:
+            self.stats.submitted += 1
+        submitted = time.perf_counter()
+        if self.processes:
+            future = self.executor.submit(_run_named, name, inputs)
+        else:
+            future = self.executor.submit(run_template, self.templates[name], inputs)
+        future.add_done_callback(lambda done: self._finished(done, submitted))
+        return future
+
+    def _finished(self, future, submitted):
+        latency = time.perf_counter() - submitted
+        with self.lock:
+            if future.cancelled() or future.exception() is not None:
+                self.stats.failed += 1
+            else:
+                self.stats.completed += 1
+                self.stats.latencies.append(latency)
+
+    def map(self, name, input_rows):
+        return [future.result() for future in [self.submit(name, inputs) for inputs in input_rows]]
+
+    def close(self, wait=True):
+        self.executor.shutdown(wait)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+# the day 5 "compare to 8" example for a few callers at once
+with VMPool({"compare to 8": [3,21,1008,21,8,20,1005,20,22,107,8,21,20,1006,20,31,1106,0,36,98,0,0,1002,21,125,20,4,20,1105,1,46,104,999,1105,1,46,1101,1000,1,20,4,20,1105,1,46,98,99]}, workers=2) as _pool:
+    assert _pool.map("compare to 8", [[7], [8], [9]]) == [[999], [1000], [1001]]
+assert _pool.stats.completed == 3 and _pool.stats.queue_depth == 0
@@ -0,0 +1,134 @@
+"""
+Day 6 orbit maps for big galaxies.
+
+Objects get numbered, and the map becomes an array of parents (who orbits whom) plus an array of depths (how many objects
+every object orbits, directly and indirectly). The depths are worked out in one pass without recursion, so chains millions of
+objects deep are no problem, and the day 6 checksum is just their sum.
+
+TransferIndex answers part 2 style questions (how many transfers between two objects) for any pair in O(log n),
+through the lowest common ancestor of the two.
+"""
+from array import array
+
+
+class OrbitMap:
+    # `orbits` are (center, satellite) pairs, like the "COM)B" lines of the puzzle input
+    def __init__(self, orbits):
+        self.names = []
+        self.index = {}
+        parents = {}
+        for center, satellite in orbits:
+            center, satellite = self._number(center), self._number(satellite)
+            if satellite in parents:
+                raise ValueError(f"{self.names[satellite]} orbits both {self.names[parents[satellite]]} and {self.names[center]}")
+            parents[satellite] = center
+        # -1 for objects that don't orbit anything (COM)
+        self.parents = array("q", (parents.get(node, -1) for node in range(len(self.names))))
+        self.depths = self._depths()
+
+    def _number(self, name):
+        if name not in self.index:
+            self.index[name] = len(self.names)
+            self.names.append(name)
+        return self.index[name]
+
+    @classmethod
+    def from_lines(cls, lines):
+        return cls(line.strip().split(")") for line in lines if line.strip())
+
+    # from day6.py's galaxy, {object: [the object it orbits]}
+    @classmethod
+    def from_galaxy(cls, galaxy):
+        return cls((centers[0], satellite) for satellite, centers in galaxy.items())
+
+    # Every object's depth, memoized as we go: walk up from an object until we hit one whose depth is known (or COM),
+    # then fill in the depths on the way back down. Every object gets filled in exactly once, so it's linear in the size of the map.
+    def _depths(self):
+        parents = self.parents
+        depths = array("q", [-1]) * len(parents)
+        for node in range(len(parents)):
+            path = []
+            while node != -1 and depths[node] == -1:
+                # -2 marks objects on the path we're walking right now, running into one of those again means a cycle
+                depths[node] = -2
+                path.append(node)
+                node = parents[node]
+            if node != -1 and depths[node] == -2:
+                raise ValueError(f"orbit cycle through {self.names[node]}")
+            depth = -1 if node == -1 else depths[node]
+            for node in reversed(path):
+                depth += 1
+                depths[node] = depth
+        return depths
+
+    def depth(self, name):
+        return self.depths[self.index[name]]
+
+    # total number of direct and indirect orbits
+    def checksum(self):
+        return sum(self.depths)
+
+
+# Lowest common ancestor index by binary lifting: jumps[k][node] is the object 2**k steps closer to COM than node
+# (COM itself stays put). Any two objects are first lifted to the same depth, then together by decreasing powers of two
+# for as long as they stay apart, so a query takes O(log depth) jumps. Building it takes O(n log depth) time and memory.
+class TransferIndex:
+    def __init__(self, orbit_map):
+        self.map = orbit_map
+        level = array("q", (node if parent == -1 else parent for node, parent in enumerate(orbit_map.parents)))
+        self.jumps = [level]
+        for _ in range(1, max(orbit_map.depths, default=0).bit_length()):
+            # two jumps of the previous size make one of this size
+            level = array("q", (level[node] for node in level))
+            self.jumps.append(level)
+
+    # the closest object both a and b orbit (or are), by number; -1 if they're in separate maps
+    def common_center(self, a, b):
+        depths, jumps = self.map.depths, self.jumps
+        if depths[a] < depths[b]:
+            a, b = b, a
+        difference, k = depths[a] - depths[b], 0
+        while difference:
+            if difference & 1:
+                a = jumps[k][a]
+            difference >>= 1
+            k += 1
+        if a == b:
+            return a
+        for level in reversed(jumps):
+            if level[a] != level[b]:
+                a, b = level[a], level[b]
+        a, b = jumps[0][a], jumps[0][b]
+        return a if a == b else -1
+
+    # transfers to get from object a to object b
+    def distance(self, a, b):
+        index, depths = self.map.index, self.map.depths
+        a, b = index[a], index[b]
+        center = self.common_center(a, b)
+        if center == -1:
+            raise ValueError(f"{self.map.names[a]} and {self.map.names[b]} aren't in the same orbit map")
+        return depths[a] + depths[b] - 2 * depths[center]
+
+    # the day 6 question: transfers between the objects a and b are orbiting (not between a and b themselves)
+    def transfers(self, a, b):
+        names, parents = self.map.names, self.map.parents
+        centers = [parents[self.map.index[name]] for name in (a, b)]
+        if -1 in centers:
+            raise ValueError("COM doesn't orbit anything")
+        return self.distance(names[centers[0]], names[centers[1]])
+
+    # answer a whole file of queries, one "A B" pair per line (a comma works too), in order
+    def transfers_from_file(self, path):
+        with open(path) as query_file:
+            return [self.transfers(*line.replace(",", " ").split()) for line in query_file if line.strip()]
+
+
+_sample = OrbitMap.from_lines(["COM)B", "B)C", "C)D", "D)E", "E)F", "B)G", "G)H", "D)I", "E)J", "J)K", "K)L"])
+assert _sample.checksum() == 42 and _sample.depth("L") == 7
+# one long chain, far deeper than the recursion limit
+assert OrbitMap((i, i + 1) for i in range(100000)).checksum() == 100000 * 100001 // 2
+
+# the part 2 example: from K (where YOU is) to I (where SAN is) takes 4 transfers
+_index = TransferIndex(OrbitMap.from_lines(["COM)B", "B)C", "C)D", "D)E", "E)F", "B)G", "G)H", "D)I", "E)J", "J)K", "K)L", "K)YOU", "I)SAN"]))
+assert _index.transfers("YOU", "SAN") == 4 and _index.distance("H", "F") == 6 and _index.distance("COM", "L") == 7
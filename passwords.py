@@ -0,0 +1,184 @@
+"""
+Day 4 passwords without looking at every number in the range.
+
+Only numbers whose digits never decrease can be valid, and there are very few of those (3003 with six digits), so
+non_decreasing() produces exactly those, straight from combinations of digits.
+
+For ranges far too big to list even those, PasswordCounter counts with a digit DP instead: the rules are small state machines
+that read a number one digit at a time, and the counter only keeps track of how many numbers end up in each state.
+"""
+from collections import Counter
+from dataclasses import dataclass
+from itertools import combinations_with_replacement
+from typing import Callable
+
+
+# The smallest number >= `number` whose digits never decrease, as a string: everything after the first decrease goes up to the
+# digit right before it (543 -> 555, 1290 -> 1299).
+def _round_up(number):
+    digits = str(number)
+    for i in range(1, len(digits)):
+        if digits[i] < digits[i - 1]:
+            return digits[:i] + digits[i - 1] * (len(digits) - i)
+    return digits
+
+
+# Every number with as many digits as `start` whose digits never decrease, from `start` (one of those itself) up, as strings.
+# Going from the last position to the first, keep everything before it, put a bigger digit there, and follow that with every
+# sorted combination of digits at least as big; each of those groups comes out in increasing order and is above the one before.
+def _non_decreasing_from(start):
+    yield start
+    for i in range(len(start) - 1, -1, -1):
+        for digit in range(int(start[i]) + 1, 10):
+            head = start[:i] + str(digit)
+            for rest in combinations_with_replacement("0123456789"[digit:], len(start) - i - 1):
+                yield head + "".join(rest)
+
+
+# Every number in [low, high] whose digits never decrease, in increasing order, for any number of digits.
+# It starts right at the first one >= low (see _round_up), so the work is proportional to how many there are in the range,
+# not to how far low is from the smallest one of its length. With more digits than that, the first one is 11...1.
+def non_decreasing(low, high):
+    start = _round_up(max(low, 0))
+    for length in range(len(start), len(str(high)) + 1):
+        for digits in _non_decreasing_from(start if length == len(start) else "1" * length):
+            number = int(digits)
+            if number > high:
+                return
+            yield number
+
+
+# the rules from the puzzle, for numbers whose digits never decrease (equal digits are always next to each other then)
+def has_pair(number):
+    digits = str(number)
+    return any(a == b for a, b in zip(digits, digits[1:]))
+
+
+def has_exact_pair(number):
+    return 2 in Counter(str(number)).values()
+
+
+def count_passwords(low, high, rule):
+    return sum(1 for number in non_decreasing(low, high) if rule(number))
+
+
+# A rule as a state machine over the digits of a number, most significant first. step(state, digit) gives the next state,
+# or None if no number starting like this can pass anymore. accepts(state) tells whether a number that ends here passes.
+# States have to be hashable, the counter memoizes on them.
+@dataclass(frozen=True)
+class Rule:
+    name: str
+    start: object
+    step: Callable
+    accepts: Callable
+
+
+# state: the previous digit (-1 before the first one)
+NON_DECREASING = Rule("non-decreasing", -1, lambda last, digit: None if digit < last else digit, lambda last: True)
+
+# state: (previous digit, seen two equal digits next to each other yet)
+ADJACENT_PAIR = Rule("adjacent pair", (-1, False),
+                     lambda state, digit: (digit, state[1] or digit == state[0]),
+                     lambda state: state[1])
+
+
+# state: (previous digit, length of the current run of it, capped at 3, seen a run of exactly two yet)
+def _exact_pair_step(state, digit):
+    last, run, found = state
+    if digit == last:
+        return digit, min(run + 1, 3), found
+    return digit, 1, found or run == 2
+
+EXACT_PAIR = Rule("run of exactly two", (-1, 0, False), _exact_pair_step, lambda state: state[2] or state[1] == 2)
+
+
+# all of `rules` at once, as one state machine whose state is the tuple of their states
+def all_of(*rules):
+    def step(states, digit):
+        next_states = []
+        for rule, state in zip(rules, states):
+            state = rule.step(state, digit)
+            if state is None:
+                return None
+            next_states.append(state)
+        return tuple(next_states)
+
+    def accepts(states):
+        return all(rule.accepts(state) for rule, state in zip(rules, states))
+
+    return Rule(" and ".join(rule.name for rule in rules), tuple(rule.start for rule in rules), step, accepts)
+
+
+PART_1 = all_of(NON_DECREASING, ADJACENT_PAIR)
+PART_2 = all_of(NON_DECREASING, EXACT_PAIR)
+
+
+# Counts the numbers in a range that pass a rule, in time polynomial in the number of digits.
+# The expensive part, how many ways there are to finish a number from some state with some number of digits left, doesn't depend
+# on the range at all, so it's memoized on the counter and every later query (with the same or a longer bound) reuses it.
+class PasswordCounter:
+    def __init__(self, rule):
+        self.rule = rule
+        # (state, digits left) -> how many ways to finish
+        self.completions = {}
+
+    def _completions(self, state, left):
+        key = (state, left)
+        if key not in self.completions:
+            if left == 0:
+                self.completions[key] = 1 if self.rule.accepts(state) else 0
+            else:
+                total = 0
+                for digit in range(10):
+                    next_state = self.rule.step(state, digit)
+                    if next_state is not None:
+                        total += self._completions(next_state, left - 1)
+                self.completions[key] = total
+        return self.completions[key]
+
+    # how many numbers in [0, bound] pass (written without leading zeros)
+    def count_up_to(self, bound):
+        if bound < 0:
+            return 0
+        rule = self.rule
+        digits = [int(digit) for digit in str(bound)]
+        total = 0
+        # every number with fewer digits than the bound
+        for length in range(1, len(digits)):
+            for first in range(10) if length == 1 else range(1, 10):
+                state = rule.step(rule.start, first)
+                if state is not None:
+                    total += self._completions(state, length - 1)
+        # same length: follow the bound digit by digit, and at every position count the numbers that go below it there
+        state = rule.start
+        for position, bound_digit in enumerate(digits):
+            lowest = 1 if position == 0 and len(digits) > 1 else 0
+            for digit in range(lowest, bound_digit):
+                next_state = rule.step(state, digit)
+                if next_state is not None:
+                    total += self._completions(next_state, len(digits) - position - 1)
+            state = rule.step(state, bound_digit)
+            if state is None:
+                return total
+        return total + (1 if rule.accepts(state) else 0)
+
+    def count(self, low, high):
+        if high < low:
+            return 0
+        return self.count_up_to(high) - self.count_up_to(low - 1)
+
+
+assert list(non_decreasing(0, 12)) == [0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 11, 12]
+assert list(non_decreasing(111109, 111123)) == [111111, 111112, 111113, 111114, 111115, 111116, 111117, 111118, 111119, 111122, 111123]
+# a narrow range high up only walks the few candidates inside it
+assert list(non_decreasing(888888888888, 888888888899)) == [888888888888, 888888888889, 888888888899]
+assert has_exact_pair(112233) and not has_exact_pair(123444) and has_exact_pair(111122)
+
+# the digit DP agrees with the enumerator, and handles ranges no enumerator could
+assert PasswordCounter(PART_2).count(100000, 999999) == count_passwords(100000, 999999, has_exact_pair)
+# 18 digits: any non-decreasing choice of 18 digits from 1-9 (there are C(26, 8) of those) has to repeat one
+assert PasswordCounter(PART_1).count(10**17, 10**18 - 1) == 1562275
+
+# a rule of your own: the digits add up to a multiple of 7 (the state is the sum so far, modulo 7)
+_SUM_7 = Rule("digit sum divisible by 7", 0, lambda total, digit: (total + digit) % 7, lambda total: total == 0)
+assert PasswordCounter(all_of(NON_DECREASING, _SUM_7)).count(1, 10**4) == sum(1 for number in non_decreasing(1, 10**4) if sum(map(int, str(number))) % 7 == 0)
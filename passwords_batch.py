@@ -0,0 +1,89 @@
+"""
+Brute-force password checking with NumPy, for rules that don't fit in a state machine (see passwords.py for the ones that do).
+
+The range is cut into chunks of numbers with the same number of digits. Every chunk becomes an (N, digits) matrix of digits,
+and a rule is any function that takes such a matrix and returns one bool per row, built from array operations like np.diff.
+Chunks are checked on a process pool and come back one by one, so memory stays at a few chunks no matter how big the range is.
+Rules have to be module-level functions, so the worker processes can find them.
+"""
+import multiprocessing
+from collections import deque
+
+import numpy as np
+
+CHUNK_SIZE = 1 << 20
+
+
+# the digits of every number in [start, stop), most significant first, as an (N, digits) int8 matrix
+def digit_matrix(start, stop, digits):
+    numbers = np.arange(start, stop, dtype=np.int64)
+    powers = 10 ** np.arange(digits - 1, -1, -1, dtype=np.int64)
+    return (numbers[:, None] // powers % 10).astype(np.int8)
+
+
+def non_decreasing(matrix):
+    return (np.diff(matrix, axis=1) >= 0).all(axis=1)
+
+
+def has_pair(matrix):
+    return (np.diff(matrix, axis=1) == 0).any(axis=1)
+
+
+# A run of exactly two: two equal neighbours, without an equal digit right before or right after them.
+# Padding the "equal to the next digit" matrix with False on both sides keeps the first and last pair simple.
+def has_exact_pair(matrix):
+    equal = np.diff(matrix, axis=1) == 0
+    padded = np.pad(equal, ((0, 0), (1, 1)), constant_values=False)
+    return (padded[:, 1:-1] & ~padded[:, :-2] & ~padded[:, 2:]).any(axis=1)
+
+
+PART_1 = (non_decreasing, has_pair)
+PART_2 = (non_decreasing, has_exact_pair)
+
+
+# [start, stop) pieces of at most `chunk_size` numbers covering [low, high], never mixing numbers of different lengths
+def chunks(low, high, chunk_size=CHUNK_SIZE):
+    low = max(low, 0)
+    for digits in range(len(str(low)), len(str(high)) + 1):
+        start = max(low, 10 ** (digits - 1) if digits > 1 else 0)
+        stop = min(high + 1, 10 ** digits)
+        for chunk_start in range(start, stop, chunk_size):
+            yield chunk_start, min(chunk_start + chunk_size, stop), digits
+
+
+def check_chunk(chunk, rules):
+    start, stop, digits = chunk
+    matrix = digit_matrix(start, stop, digits)
+    passes = np.ones(stop - start, dtype=bool)
+    for rule in rules:
+        passes &= rule(matrix)
+    return start + np.flatnonzero(passes)
+
+
+# Arrays of the numbers in [low, high] that pass every rule, one per chunk and in increasing order, as they're done.
+# workers=1 checks in this process, anything else uses a process pool (None = one per core).
+def matching(low, high, rules, chunk_size=CHUNK_SIZE, workers=None):
+    if workers == 1:
+        for chunk in chunks(low, high, chunk_size):
+            yield check_chunk(chunk, rules)
+        return
+    workers = workers or multiprocessing.cpu_count()
+    with multiprocessing.Pool(workers) as pool:
+        # only a couple of chunks per worker are handed out ahead of the one we're waiting for,
+        # so a slow consumer doesn't make finished chunks pile up
+        pending = deque()
+        for chunk in chunks(low, high, chunk_size):
+            pending.append(pool.apply_async(check_chunk, (chunk, rules)))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().get()
+        while pending:
+            yield pending.popleft().get()
+
+
+def count_matching(low, high, rules, chunk_size=CHUNK_SIZE, workers=None):
+    return sum(len(numbers) for numbers in matching(low, high, rules, chunk_size, workers))
+
+
+assert has_exact_pair(digit_matrix(112233, 112234, 6))[0] and not has_exact_pair(digit_matrix(123444, 123445, 6))[0]
+assert has_exact_pair(digit_matrix(111122, 111123, 6))[0]
+assert count_matching(0, 1200, PART_1, chunk_size=100, workers=1) == 135
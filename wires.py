@@ -0,0 +1,432 @@
+"""
+Day 3 wires as segments instead of grid cells.
+
+A wire is kept as its list of horizontal and vertical segments, so the work grows with the number of steps in the path and
+not with how long they are (R1000000 is one segment like any other). Crossings between two wires are found with a sweep line
+over the segment endpoints, and the distance and step count of the best crossing on every pair of touching segments is worked
+out directly from where the segments start. Like day3.py, wires running on top of each other cross at every shared cell, and
+the central port itself doesn't count.
+
+For many wires at once there's WireIndex, a uniform grid of buckets over all their segments,
+and EditableWires keeps the answers for two wires up to date while their paths are being edited.
+"""
+import heapq
+from bisect import bisect_left, insort
+from collections import defaultdict
+from dataclasses import dataclass
+from functools import cached_property
+
+DIRECTIONS = {"R": (1, 0), "L": (-1, 0), "U": (0, 1), "D": (0, -1)}
+
+
+# One straight piece of a wire from (x1, y1) to (x2, y2). `steps` is how many steps the wire took before reaching its start.
+@dataclass(frozen=True)
+class Segment:
+    x1: int
+    y1: int
+    x2: int
+    y2: int
+    steps: int
+
+    @property
+    def horizontal(self):
+        return self.y1 == self.y2
+
+    # (x_low, x_high, y_low, y_high), the bounding box of the segment; the crossing checks need it all the time
+    @cached_property
+    def box(self):
+        return min(self.x1, self.x2), max(self.x1, self.x2), min(self.y1, self.y2), max(self.y1, self.y2)
+
+    @property
+    def length(self):
+        return abs(self.x2 - self.x1) + abs(self.y2 - self.y1)
+
+    # steps the wire has taken when it reaches (x, y) on this segment
+    def steps_to(self, x, y):
+        return self.steps + abs(x - self.x1) + abs(y - self.y1)
+
+
+# Turn a path like ["R8", "U5", ...] (or "R8,U5,...") into its segments. Steps of length 0 don't make a segment.
+def parse_wire(path):
+    if isinstance(path, str):
+        path = path.strip().split(",")
+    segments = []
+    x, y, steps = 0, 0, 0
+    for step in path:
+        if step[0] not in DIRECTIONS:
+            raise ValueError(f"unknown direction in step {step!r}")
+        (dx, dy), length = DIRECTIONS[step[0]], int(step[1:])
+        if length:
+            segments.append(Segment(x, y, x + dx * length, y + dy * length, steps))
+        x, y, steps = x + dx * length, y + dy * length, steps + length
+    return segments
+
+
+def boxes_touch(box_a, box_b):
+    return box_a[0] <= box_b[1] and box_b[0] <= box_a[1] and box_a[2] <= box_b[3] and box_b[2] <= box_a[3]
+
+
+# Every pair (segment of a, segment of b) that touches, found with a sweep line from left to right. Segments become active at
+# their left end and are dropped after their right end. Horizontal ones stay active for a while and sit in a list sorted by y,
+# vertical ones only live at a single x. Every new segment looks up the other wire's active segments in its y range,
+# so each touching pair is found once, by whichever of the two starts last.
+def touching_pairs(segments_a, segments_b):
+    wires = (segments_a, segments_b)
+    events = []
+    for wire, segments in enumerate(wires):
+        for index, segment in enumerate(segments):
+            x_low, x_high, _, _ = segment.box
+            # at the same x everything is added before anything is removed, so segments that only share an end point still touch
+            events.append((x_low, 0, wire, index))
+            events.append((x_high, 1, wire, index))
+    events.sort()
+
+    horizontals = ([], [])
+    verticals = (set(), set())
+    for _, removing, wire, index in events:
+        segment = wires[wire][index]
+        _, _, y_low, y_high = segment.box
+        if removing:
+            if segment.horizontal:
+                active = horizontals[wire]
+                del active[bisect_left(active, (segment.y1, index))]
+            else:
+                verticals[wire].discard(index)
+            continue
+
+        other = 1 - wire
+        others = wires[other]
+        active = horizontals[other]
+        found = []
+        for position in range(bisect_left(active, (y_low, -1)), len(active)):
+            y, other_index = active[position]
+            if y > y_high:
+                break
+            found.append(other_index)
+        for other_index in verticals[other]:
+            _, _, other_low, other_high = others[other_index].box
+            if other_low <= y_high and y_low <= other_high:
+                found.append(other_index)
+        for other_index in found:
+            yield (segment, others[other_index]) if wire == 0 else (others[other_index], segment)
+
+        if segment.horizontal:
+            insort(horizontals[wire], (segment.y1, index))
+        else:
+            verticals[wire].add(index)
+
+
+# The lowest Manhattan distance and the lowest combined steps over the cells two touching segments share (not counting the
+# central port), or None if the port is all they share. Crossing segments share one cell, but segments on top of each other share
+# a whole stretch. Both measures change linearly between the ends of that stretch, the segment starts and the port, so those
+# (plus the cells next to the port) are the only candidates that need checking.
+def pair_minimums(segment_a, segment_b):
+    a_box, b_box = segment_a.box, segment_b.box
+    x_low, x_high = max(a_box[0], b_box[0]), min(a_box[1], b_box[1])
+    y_low, y_high = max(a_box[2], b_box[2]), min(a_box[3], b_box[3])
+    if x_low == x_high and y_low == y_high:
+        # the common case, a single crossing cell
+        if x_low == 0 and y_low == 0:
+            return None
+        return abs(x_low) + abs(y_low), segment_a.steps_to(x_low, y_low) + segment_b.steps_to(x_low, y_low)
+
+    def candidates(low, high, starts):
+        return {min(max(value, low), high) for value in (low, high, -1, 0, 1) + starts}
+
+    best_distance = best_steps = None
+    for x in candidates(x_low, x_high, (segment_a.x1, segment_b.x1)):
+        for y in candidates(y_low, y_high, (segment_a.y1, segment_b.y1)):
+            if x == 0 and y == 0:
+                continue
+            distance = abs(x) + abs(y)
+            steps = segment_a.steps_to(x, y) + segment_b.steps_to(x, y)
+            if best_distance is None or distance < best_distance:
+                best_distance = distance
+            if best_steps is None or steps < best_steps:
+                best_steps = steps
+    if best_distance is None:
+        return None
+    return best_distance, best_steps
+
+
+# Both day 3 answers at once for two paths: (closest crossing by Manhattan distance, fewest combined steps to a crossing),
+# or None if the wires never cross. The two can come from different crossings.
+def closest_crossing(path_a, path_b):
+    best_distance = best_steps = None
+    for segment_a, segment_b in touching_pairs(parse_wire(path_a), parse_wire(path_b)):
+        minimums = pair_minimums(segment_a, segment_b)
+        if minimums is None:
+            continue
+        distance, steps = minimums
+        if best_distance is None or distance < best_distance:
+            best_distance = distance
+        if best_steps is None or steps < best_steps:
+            best_steps = steps
+    if best_distance is None:
+        return None
+    return best_distance, best_steps
+
+
+# keep the lowest distance and the lowest steps per key
+def _merge(results, key, minimums):
+    if key in results:
+        old_distance, old_steps = results[key]
+        minimums = min(old_distance, minimums[0]), min(old_steps, minimums[1])
+    results[key] = minimums
+
+
+# Both WireIndex and EditableWires cut the plane into square buckets of `size` and list every segment in each bucket it passes
+# through; these are the (column, row) buckets a bounding box covers.
+def _cells(box, size):
+    x_low, x_high, y_low, y_high = box
+    for column in range(x_low // size, x_high // size + 1):
+        for row in range(y_low // size, y_high // size + 1):
+            yield column, row
+
+
+# the bucket size to use when none is given: the average segment length, so a typical segment spans one or two buckets
+def _auto_cell_size(segments, default):
+    lengths = [segment.length for segment in segments]
+    return max(1, sum(lengths) // len(lengths)) if lengths else default
+
+
+# Spatial index over the segments of many wires: the plane is cut into square buckets of `cell_size`, and every segment is listed
+# in each bucket it passes through. Only segments that share a bucket can touch, so as long as the buckets stay small compared to
+# the whole picture, the work for all crossings grows with the number of segments instead of with the number of wire pairs.
+# Without a cell_size, the first bulk insert picks one from its segments (see _auto_cell_size).
+class WireIndex:
+    def __init__(self, cell_size=None):
+        self.cell_size = cell_size
+        # name -> segments, and name -> insertion number (pairs are always reported in insertion order)
+        self.wires = {}
+        self.order = {}
+        # (column, row) -> [(name, segment)]
+        self.buckets = defaultdict(list)
+
+    # A pair of segments that shares several buckets would show up in each of them,
+    # so it only counts in the bucket holding the low corner of the stretch they share.
+    def _owns(self, cell, segment_a, segment_b):
+        box_a, box_b = segment_a.box, segment_b.box
+        return (max(box_a[0], box_b[0]) // self.cell_size, max(box_a[2], box_b[2]) // self.cell_size) == cell
+
+    def add(self, name, path):
+        self.add_many({name: path})
+
+    # bulk insert, `wires` is a dict (or iterable of pairs) name -> path
+    def add_many(self, wires):
+        parsed = {name: parse_wire(path) for name, path in dict(wires).items()}
+        if self.cell_size is None:
+            self.cell_size = _auto_cell_size([segment for segments in parsed.values() for segment in segments], 1)
+        for name, segments in parsed.items():
+            if name in self.wires:
+                raise ValueError(f"wire {name!r} is already in the index")
+            self.order[name] = len(self.order)
+            self.wires[name] = segments
+            for segment in segments:
+                for cell in _cells(segment.box, self.cell_size):
+                    self.buckets[cell].append((name, segment))
+
+    def _key(self, name_a, name_b):
+        return (name_a, name_b) if self.order[name_a] < self.order[name_b] else (name_b, name_a)
+
+    # every other wire that crosses wire `name`, with the (distance, steps) of the best crossings between the two
+    def crossings(self, name):
+        results = {}
+        for segment in self.wires[name]:
+            for cell in _cells(segment.box, self.cell_size):
+                for other_name, other in self.buckets.get(cell, ()):
+                    if other_name == name or not boxes_touch(segment.box, other.box) or not self._owns(cell, segment, other):
+                        continue
+                    minimums = pair_minimums(segment, other)
+                    if minimums is not None:
+                        _merge(results, other_name, minimums)
+        return results
+
+    # names of the wires that cross wire `name`
+    def crossing_wires(self, name):
+        return set(self.crossings(name))
+
+    # {(name_a, name_b): (distance, steps)} for every pair of wires that cross, looking at one bucket at a time
+    def all_pairs(self):
+        results = {}
+        for cell, entries in self.buckets.items():
+            for i, (name_a, segment_a) in enumerate(entries):
+                for name_b, segment_b in entries[i+1:]:
+                    if name_a == name_b or not boxes_touch(segment_a.box, segment_b.box) or not self._owns(cell, segment_a, segment_b):
+                        continue
+                    minimums = pair_minimums(segment_a, segment_b)
+                    if minimums is not None:
+                        _merge(results, self._key(name_a, name_b), minimums)
+        return results
+
+    # The crossing closest to the port over all wires, as (distance, name_a, name_b), or None if no wires cross.
+    # Buckets are checked in order of the lowest distance anything in them could have, stopping as soon as that can't beat the best
+    # crossing found so far. A crossing gets checked in every bucket it's in here (not just one), so its own bucket always comes in time.
+    def nearest_crossing(self):
+        size = self.cell_size
+
+        def lower_bound(cell):
+            bound = 0
+            for low in (cell[0] * size, cell[1] * size):
+                high = low + size - 1
+                bound += 0 if low <= 0 <= high else min(abs(low), abs(high))
+            return bound
+
+        best = None
+        for bound, cell in sorted((lower_bound(cell), cell) for cell in self.buckets):
+            if best is not None and bound >= best[0]:
+                break
+            entries = self.buckets[cell]
+            for i, (name_a, segment_a) in enumerate(entries):
+                for name_b, segment_b in entries[i+1:]:
+                    if name_a == name_b or not boxes_touch(segment_a.box, segment_b.box):
+                        continue
+                    minimums = pair_minimums(segment_a, segment_b)
+                    if minimums is not None and (best is None or minimums[0] < best[0]):
+                        best = (minimums[0],) + self._key(name_a, name_b)
+        return best
+
+
+# Two wires whose paths can be edited a step at a time: append a step, drop the last one, or change one in the middle.
+# Every step keeps its own segment, listed in a grid of buckets like WireIndex, and the best (distance, steps) of every pair of
+# touching segments is kept in `pairs`. An edit only redoes the segments it moves: appending or dropping a step touches one segment,
+# changing step i redoes step i and everything after it (those all shift). Both answers are kept up to date in a heap each, so
+# reading them costs O(log pairs) at most instead of a scan over every pair.
+class EditableWires:
+    def __init__(self, path_a=(), path_b=(), cell_size=None):
+        paths = [path.strip().split(",") if isinstance(path, str) else list(path) for path in (path_a, path_b)]
+        if cell_size is None:
+            cell_size = _auto_cell_size([segment for path in paths for segment in parse_wire(path)], 100)
+        self.cell_size = cell_size
+        self.paths = ([], [])
+        # per wire and step: its segment (None for a step of length 0), and (x, y, steps) where the wire is after it
+        self.segments = ([], [])
+        self.ends = ([], [])
+        # per wire, (column, row) -> indices of the segments in that bucket
+        self.buckets = (defaultdict(set), defaultdict(set))
+        # (index in wire 0, index in wire 1) -> (distance, steps), only for pairs that cross somewhere other than the port
+        self.pairs = {}
+        # per wire and step, the indices of the other wire's segments it's paired with
+        self.partners = ([], [])
+        # (distance, pair) and (steps, pair) for every pair in `pairs`. Dropped pairs are left in and skipped once they reach the
+        # top (an entry counts as long as its pair is still there with that value), and the heaps get rebuilt when mostly stale.
+        self.by_distance = []
+        self.by_steps = []
+        for wire, path in enumerate(paths):
+            for step in path:
+                self.append(wire, step)
+
+    def append(self, wire, step):
+        if step[0] not in DIRECTIONS:
+            raise ValueError(f"unknown direction in step {step!r}")
+        x, y, steps = self.ends[wire][-1] if self.ends[wire] else (0, 0, 0)
+        (dx, dy), length = DIRECTIONS[step[0]], int(step[1:])
+        segment = Segment(x, y, x + dx * length, y + dy * length, steps) if length else None
+        index = len(self.paths[wire])
+        self.paths[wire].append(step)
+        self.segments[wire].append(segment)
+        self.ends[wire].append((x + dx * length, y + dy * length, steps + length))
+        self.partners[wire].append(set())
+        if segment is None:
+            return
+
+        other = 1 - wire
+        candidates = set()
+        for cell in _cells(segment.box, self.cell_size):
+            self.buckets[wire][cell].add(index)
+            candidates.update(self.buckets[other].get(cell, ()))
+        for other_index in candidates:
+            other_segment = self.segments[other][other_index]
+            if not boxes_touch(segment.box, other_segment.box):
+                continue
+            minimums = pair_minimums(segment, other_segment) if wire == 0 else pair_minimums(other_segment, segment)
+            if minimums is not None:
+                key = (index, other_index) if wire == 0 else (other_index, index)
+                self.pairs[key] = minimums
+                heapq.heappush(self.by_distance, (minimums[0], key))
+                heapq.heappush(self.by_steps, (minimums[1], key))
+                self.partners[wire][index].add(other_index)
+                self.partners[other][other_index].add(index)
+
+    # drop the last step of a wire and return it
+    def pop(self, wire):
+        index = len(self.paths[wire]) - 1
+        segment = self.segments[wire].pop()
+        self.ends[wire].pop()
+        other = 1 - wire
+        for other_index in self.partners[wire].pop():
+            del self.pairs[(index, other_index) if wire == 0 else (other_index, index)]
+            self.partners[other][other_index].discard(index)
+        if segment is not None:
+            for cell in _cells(segment.box, self.cell_size):
+                bucket = self.buckets[wire][cell]
+                bucket.discard(index)
+                if not bucket:
+                    del self.buckets[wire][cell]
+        if len(self.by_distance) > 2 * len(self.pairs) + 64:
+            self.by_distance = [(distance, key) for key, (distance, _) in self.pairs.items()]
+            self.by_steps = [(steps, key) for key, (_, steps) in self.pairs.items()]
+            heapq.heapify(self.by_distance)
+            heapq.heapify(self.by_steps)
+        return self.paths[wire].pop()
+
+    # replace step `index` of a wire; everything after it moves along, so those steps get redone as well
+    def change(self, wire, index, step):
+        rest = self.paths[wire][index+1:]
+        while len(self.paths[wire]) > index:
+            self.pop(wire)
+        for redo in [step] + rest:
+            self.append(wire, redo)
+
+    # the lowest value of field 0 (distance) or 1 (steps) over all pairs, throwing out stale heap entries on the way
+    def _best(self, heap, field):
+        while heap:
+            value, key = heap[0]
+            minimums = self.pairs.get(key)
+            if minimums is not None and minimums[field] == value:
+                return value
+            heapq.heappop(heap)
+        return None
+
+    @property
+    def closest_distance(self):
+        return self._best(self.by_distance, 0)
+
+    @property
+    def fewest_steps(self):
+        return self._best(self.by_steps, 1)
+
+    # every cell where the wires cross (a cell shared by several pairs of segments shows up once)
+    def intersections(self):
+        cells = set()
+        for index_a, index_b in self.pairs:
+            box_a, box_b = self.segments[0][index_a].box, self.segments[1][index_b].box
+            for x in range(max(box_a[0], box_b[0]), min(box_a[1], box_b[1]) + 1):
+                for y in range(max(box_a[2], box_b[2]), min(box_a[3], box_b[3]) + 1):
+                    cells.add((x, y))
+        cells.discard((0, 0))
+        return cells
+
+
+# examples from the puzzle
+assert closest_crossing("R8,U5,L5,D3", "U7,R6,D4,L4") == (6, 30)
+assert closest_crossing("R75,D30,R83,U83,L12,D49,R71,U7,L72", "U62,R66,U55,R34,D71,R55,D58,R83") == (159, 610)
+assert closest_crossing("R98,U47,R26,D63,R33,U87,L62,D20,R33,U53,R51", "U98,R91,D20,R16,D67,R40,U7,R15,U6,R7") == (135, 410)
+# wires on top of each other cross at every cell they share, and a single segment of a million steps is no problem
+assert closest_crossing("R10", "U1,R5,D1,R5") == (5, 12)
+assert closest_crossing("R1000000,U5", "U1,R1000000,D2") == (1000000, 2000002)
+
+# three wires: 1 and 2 are the first example from the puzzle, 3 only crosses wire 2
+_index = WireIndex()
+_index.add_many({1: "R8,U5,L5,D3", 2: "U7,R6,D4,L4", 3: "L2,U3,R4"})
+assert _index.all_pairs() == {(1, 2): (6, 30), (2, 3): (3, 10)}
+assert _index.crossing_wires(3) == {2} and _index.nearest_crossing() == (3, 2, 3)
+
+# editing the first example from the puzzle: dropping the last step of the second wire removes the crossing at (3, 3),
+# then shortening the first wire's "U5" to "U4" moves the other crossing from (6, 5) to (6, 4)
+_wires = EditableWires("R8,U5,L5,D3", "U7,R6,D4,L4")
+assert (_wires.closest_distance, _wires.fewest_steps, _wires.intersections()) == (6, 30, {(3, 3), (6, 5)})
+assert _wires.pop(1) == "L4"
+assert (_wires.closest_distance, _wires.fewest_steps, _wires.intersections()) == (11, 30, {(6, 5)})
+_wires.change(0, 1, "U4")
+assert (_wires.closest_distance, _wires.fewest_steps, _wires.intersections()) == (10, 30, {(6, 4)})
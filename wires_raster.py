@@ -0,0 +1,76 @@
+"""
+Every cell of a day 3 wire at once, with NumPy.
+
+For when the individual cells are actually needed (heatmaps, coverage), instead of the crossings only (see wires.py).
+A wire becomes one int64 array of cell keys in the order it visits them: each step's direction is repeated for its length with
+np.repeat, and np.cumsum walks them all in one go. x and y are packed into a single key, so finding the first visit to every cell
+is one np.unique, and crossing two wires is one np.intersect1d. That's 8 bytes per cell instead of a tuple and a dict entry.
+"""
+import numpy as np
+
+from wires import DIRECTIONS
+
+# x goes in the high 32 bits of the key (keeping its sign), y in the low 32 bits, shifted up by OFFSET so it's never negative.
+# Sorting keys then sorts cells by x, then y.
+OFFSET = 1 << 31
+
+
+def pack(x, y):
+    return (x << 32) | (y + OFFSET)
+
+
+def unpack(keys):
+    return keys >> 32, (keys & 0xFFFFFFFF) - OFFSET
+
+
+# keys of the cells the wire enters, in order; the cell at index i is reached after i + 1 steps
+def rasterize(path):
+    if isinstance(path, str):
+        path = path.strip().split(",")
+    if any(step[0] not in DIRECTIONS for step in path):
+        raise ValueError("unknown direction in path")
+    dx, dy = np.array([DIRECTIONS[step[0]] for step in path], dtype=np.int64).reshape(-1, 2).T
+    lengths = np.array([int(step[1:]) for step in path], dtype=np.int64)
+    x = np.cumsum(np.repeat(dx, lengths))
+    y = np.cumsum(np.repeat(dy, lengths))
+    if x.size and max(np.abs(x).max(), np.abs(y).max()) >= OFFSET:
+        raise ValueError("wire goes too far from the port to pack its cells into 64 bits")
+    return pack(x, y)
+
+
+# Every cell the wire visits (sorted keys) with the steps of the first visit, the one day 3 counts.
+# np.unique hands back the first index of every key, so that's all it takes.
+def first_visits(path):
+    keys, first = np.unique(rasterize(path), return_index=True)
+    return keys, first + 1
+
+
+# Cells both wires visit (sorted keys, without the central port), and the steps each wire takes to get there first.
+def crossings(path_a, path_b):
+    keys_a, steps_a = first_visits(path_a)
+    keys_b, steps_b = first_visits(path_b)
+    keys, index_a, index_b = np.intersect1d(keys_a, keys_b, assume_unique=True, return_indices=True)
+    keep = keys != pack(0, 0)
+    return keys[keep], steps_a[index_a][keep], steps_b[index_b][keep]
+
+
+# both day 3 answers, (closest crossing by Manhattan distance, fewest combined steps), or None if the wires never cross
+def closest_crossing(path_a, path_b):
+    keys, steps_a, steps_b = crossings(path_a, path_b)
+    if keys.size == 0:
+        return None
+    x, y = unpack(keys)
+    return int((np.abs(x) + np.abs(y)).min()), int((steps_a + steps_b).min())
+
+
+# Heatmap of many wires: every cell any of them visits (sorted keys) and how many different wires visit it.
+def coverage(paths):
+    keys = np.concatenate([np.unique(rasterize(path)) for path in paths])
+    return np.unique(keys, return_counts=True)
+
+
+assert closest_crossing("R8,U5,L5,D3", "U7,R6,D4,L4") == (6, 30)
+assert closest_crossing("R75,D30,R83,U83,L12,D49,R71,U7,L72", "U62,R66,U55,R34,D71,R55,D58,R83") == (159, 610)
+# (1, 0) is the only cell both of these visit
+_keys, _counts = coverage(["R2", "U1,R1,D1"])
+assert [list(map(int, values)) for values in unpack(_keys)] == [[0, 1, 1, 2], [1, 0, 1, 0]] and list(_counts) == [1, 2, 1, 1]